@@ -0,0 +1,127 @@
+"""
+End-to-end throughput benchmark: downloads a whole series from the local mock server.
+
+Each run (engine x thread count) executes in a fresh subprocess inside an empty temporary
+directory, so downloads, the page cache and the image store start cold and peak RSS is
+measured per run. The 'gui' engine drives ScraperThread; the others drive _scrape_manga.
+
+Usage: python -m benchmarks.bench_e2e [--engines threads async gui] [--threads 5 10 20]
+       [--chapters N] [--images N] [--latency S] [--bandwidth B/s] [--error-rate F] [--pdf]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_server import MockToonily
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = "BENCH_RESULT "
+
+def _peak_rss_mib():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def _run_gui_engine(series_url, create_pdf):
+    from PyQt6.QtCore import QCoreApplication
+    from gui.window import ScraperThread
+
+    app = QCoreApplication([])
+    thread = ScraperThread(series_url, create_pdf=create_pdf)
+    thread.download_finished.connect(app.quit)
+    thread.error_occurred.connect(app.quit)
+    thread.start()
+    app.exec()
+    thread.wait()
+
+def run_one(settings):
+    """Child process: one download of the whole series with the given engine and thread count."""
+    from utils import config
+    config.BASE_URL = settings["html_base"]
+    config.DOWNLOAD_THREADS = settings["threads"]
+    config.LOG_MODE = "quiet"
+
+    from utils.logger import flush_logs
+    from utils.metrics import get_metrics
+
+    start = time.perf_counter()
+    if settings["engine"] == "gui":
+        _run_gui_engine(settings["series_url"], settings["pdf"])
+    else:
+        import main
+        main._scrape_manga(settings["series_url"], "all", settings["pdf"], False, settings["engine"])
+    wall = time.perf_counter() - start
+    flush_logs()
+
+    report = get_metrics().report()
+    images = sum(chapter["images"] for chapter in report["chapters"].values())
+    failed = sum(chapter["failed"] for chapter in report["chapters"].values())
+    image_bytes = report["stages"].get("download_image", {}).get("bytes", 0)
+    result = {
+        "wall": wall,
+        "images": images,
+        "failed": failed,
+        "mib": image_bytes / 1024 / 1024,
+        "peak_rss_mib": _peak_rss_mib(),
+        "retries": sum(v for k, v in report["counters"].items() if k.startswith("retries_")),
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+def _spawn(settings):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+               QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    with tempfile.TemporaryDirectory() as work_dir:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_e2e", "--run-one", json.dumps(settings)],
+            cwd=work_dir, env=env, capture_output=True, text=True,
+        )
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Benchmark run failed:\n{completed.stdout[-2000:]}\n{completed.stderr[-2000:]}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--engines", nargs="+", default=["threads", "async"], choices=["threads", "async", "gui"])
+    arg_parser.add_argument("--threads", nargs="+", type=int, default=[5, 10, 20])
+    arg_parser.add_argument("--chapters", type=int, default=10)
+    arg_parser.add_argument("--images", type=int, default=30, help="Images per chapter.")
+    arg_parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every request.")
+    arg_parser.add_argument("--bandwidth", type=float, default=None, help="Bytes per second per connection.")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    arg_parser.add_argument("--pdf", action="store_true", help="Also convert every chapter to PDF.")
+    arg_parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.run_one:
+        run_one(json.loads(args.run_one))
+        return
+
+    with MockToonily(chapters=args.chapters, images_per_chapter=args.images, latency=args.latency,
+                     bandwidth=args.bandwidth, error_rate=args.error_rate) as mock:
+        print(f"{args.chapters} chapters x {args.images} images ({len(mock.base_image) / 1024:.0f} KiB each), "
+              f"latency {args.latency * 1000:.0f} ms, bandwidth {args.bandwidth or 'unlimited'}, "
+              f"error rate {args.error_rate:.0%}{', with PDF' if args.pdf else ''}")
+        print(f"{'engine':<8} {'threads':>7} {'wall s':>8} {'images/s':>9} {'MiB/s':>7} {'peak RSS':>9} {'failed':>6} {'retries':>7}")
+        for engine in args.engines:
+            for threads in args.threads:
+                result = _spawn({
+                    "engine": engine, "threads": threads, "pdf": args.pdf,
+                    "series_url": mock.series_url, "html_base": mock.html_base,
+                })
+                wall = max(result["wall"], 1e-9)
+                rss = f"{result['peak_rss_mib']:.0f} MiB" if result["peak_rss_mib"] is not None else "n/a"
+                print(f"{engine:<8} {threads:>7} {wall:>8.2f} {result['images'] / wall:>9.1f} "
+                      f"{result['mib'] / wall:>7.1f} {rss:>9} {result['failed']:>6} {result['retries']:>7}")
+
+if __name__ == "__main__":
+    main()
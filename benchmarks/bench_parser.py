@@ -0,0 +1,94 @@
+"""
+Benchmarks the HTML parser backends on saved (or synthetic) Toonily pages.
+
+Save real pages as benchmarks/fixtures/search*.html, series*.html and chapter*.html
+to benchmark against them; otherwise synthetic pages are generated.
+
+Usage: python -m benchmarks.bench_parser [--repeat N]
+"""
+
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks import fixtures
+from scraper import parser
+
+PARSERS = {
+    "search": parser.parse_search_results,
+    "series": parser.parse_manga_details,
+    "chapter": parser.parse_chapter_images,
+}
+
+def _pages():
+    saved = fixtures.load_saved_pages()
+    pages = []
+    for name, html in saved.items():
+        for kind in PARSERS:
+            if name.startswith(kind):
+                pages.append((kind, name, html))
+    if pages:
+        return pages
+
+    base_url = "https://toonily.com"
+    return [
+        ("search", "synthetic search", fixtures.search_page(base_url, "solo", 40)),
+        ("series", "synthetic series (1500 chapters)", fixtures.series_page(base_url, "solo", "Solo Leveling", 1500, 10)),
+        ("chapter", "synthetic chapter (80 images)", fixtures.chapter_page(
+            [f"https://cdn.toonily.com/img/{i:03d}.jpg" for i in range(80)])),
+    ]
+
+def _time(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+def _unstrained(parse, html):
+    """Runs `parse` on the full html.parser tree, as before subtree parsing."""
+    make_soup = parser.make_soup
+    parser.make_soup = lambda html, parse_only=None, backend=None: make_soup(html, None, "html.parser")
+    try:
+        return parse(html)
+    finally:
+        parser.make_soup = make_soup
+
+def _comparable(result):
+    # Chapter records have no equality of their own; compare their fields
+    if isinstance(result, dict) and "chapters" in result:
+        return result["title"], [(c.title, c.url, c.number, c.season, c.kind) for c in result["chapters"]]
+    return result
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    backends = ["html.parser"]
+    if parser.DEFAULT_BACKEND == "lxml":
+        backends.append("lxml")
+
+    for kind, name, html in _pages():
+        parse = PARSERS[kind]
+        print(f"\n{name} ({len(html) / 1024:.0f} KiB)")
+
+        baseline, _ = _time(lambda: BeautifulSoup(html, "html.parser"), args.repeat)
+        print(f"  full tree, html.parser (old behaviour): {baseline * 1000:8.2f} ms")
+        # Strained results must match what the parser finds in the whole page
+        reference = _comparable(_unstrained(parse, html))
+
+        results = {}
+        for backend in backends:
+            elapsed, result = _time(lambda: parse(html, backend=backend), args.repeat)
+            results[backend] = _comparable(result)
+            print(f"  strained, {backend:<11}:              {elapsed * 1000:8.2f} ms  ({baseline / elapsed:.1f}x)")
+
+        if not reference or (isinstance(reference, tuple) and not reference[1]):
+            print("  WARNING: the unstrained parse found nothing; check the page markup")
+        for backend, result in results.items():
+            if result != reference:
+                print(f"  WARNING: {backend} results differ from the unstrained html.parser parse")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmarks streaming an image response body to disk: the old iter_content(8192) loop
+against the reusable-buffer writer, in CPU seconds per MiB.
+
+Bodies are served from memory through a real urllib3/requests response, so the numbers
+measure the Python-side copy and write overhead rather than the network.
+
+Usage: python -m benchmarks.bench_writer [--size-mib N] [--repeat N] [--chunk-kib N ...]
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import tempfile
+import time
+
+import requests
+import urllib3
+
+from scraper.streaming import stream_to_file
+
+def _response(body):
+    raw = urllib3.HTTPResponse(
+        body=io.BytesIO(body),
+        headers={"Content-Length": str(len(body)), "Content-Type": "image/jpeg"},
+        status=200,
+        preload_content=False,
+    )
+    response = requests.Response()
+    response.raw = raw
+    response.status_code = 200
+    response.headers.update(raw.headers)
+    response.url = "https://cdn.toonily.com/bench.jpg"
+    return response
+
+def _old_writer(response, f, digest):
+    for chunk in response.iter_content(8192):
+        digest.update(chunk)
+        f.write(chunk)
+
+def _new_writer(chunk_size):
+    def write(response, f, digest):
+        stream_to_file(response, f, digest, chunk_size)
+    return write
+
+def _measure(write, body, path, repeat):
+    cpu = 0.0
+    for _ in range(repeat):
+        digest = hashlib.sha256()
+        start = time.process_time()
+        with open(path, "wb") as f:
+            write(_response(body), f, digest)
+        cpu += time.process_time() - start
+        if digest.hexdigest() != hashlib.sha256(body).hexdigest():
+            raise RuntimeError("Written body does not match the source")
+    return cpu / repeat
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--size-mib", type=float, default=8.0)
+    arg_parser.add_argument("--repeat", type=int, default=10)
+    arg_parser.add_argument("--chunk-kib", type=int, nargs="+", default=[64, 256, 1024])
+    args = arg_parser.parse_args()
+
+    body = os.urandom(int(args.size_mib * 1024 * 1024))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "image.part")
+
+        baseline = _measure(_old_writer, body, path, args.repeat)
+        print(f"{args.size_mib:.1f} MiB body, sha256 + write, {args.repeat} runs")
+        print(f"  iter_content(8192) (old behaviour): {baseline / args.size_mib * 1000:7.2f} ms CPU/MiB")
+
+        for chunk_kib in args.chunk_kib:
+            elapsed = _measure(_new_writer(chunk_kib * 1024), body, path, args.repeat)
+            print(f"  readinto, {chunk_kib:>5} KiB buffer:        {elapsed / args.size_mib * 1000:7.2f} ms CPU/MiB"
+                  f"  ({baseline / elapsed:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Synthetic Toonily-style pages for benchmarks (same markup the parsers read on the live site).
+"""
+
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="en-US"><head><meta charset="UTF-8"><title>{title} - Toonily</title>
+<link rel="stylesheet" href="/wp-content/themes/madara/style.css">
+<script>var manga = {{"ajax_url": "/wp-admin/admin-ajax.php"}};</script>
+</head><body class="wp-manga-template-default single single-wp-manga">
+<header class="site-header"><nav class="main-navigation"><ul>{nav}</ul></nav></header>
+"""
+
+PAGE_FOOT = """<footer class="site-footer"><div class="copyright">Toonily</div></footer>
+<script src="/wp-includes/js/jquery/jquery.min.js"></script></body></html>
+"""
+
+def _nav():
+    return "".join(f'<li class="menu-item"><a href="/genre/genre-{i}/">Genre {i}</a></li>' for i in range(40))
+
+def chapter_title(number):
+    return f"Chapter {number}"
+
+def chapter_slug(number):
+    return f"chapter-{number}"
+
+def search_page(base_url, query, results=20):
+    """Search results page with `results` entries."""
+    items = "".join(
+        f'<div class="page-item-detail manga"><div class="item-thumb"><img src="{base_url}/thumb-{i}.jpg"></div>'
+        f'<div class="item-summary"><h3 class="h5"><a href="{base_url}/serie/{query}-{i}/">{query.title()} {i}</a></h3>'
+        f'<div class="rating"><span class="score">4.{i % 10}</span></div></div></div>'
+        for i in range(results)
+    )
+    return PAGE_HEAD.format(title=query, nav=_nav()) + f'<div class="c-tabs-item">{items}</div>' + PAGE_FOOT
+
+def series_page(base_url, slug, title, chapters=200, side_stories=0):
+    """Series page listing `chapters` main chapters (newest first, like Toonily) plus side stories."""
+    entries = [
+        (f"{base_url}/serie/{slug}/side-story-{i}/", f"Side Story {i}") for i in range(side_stories, 0, -1)
+    ] + [
+        (f"{base_url}/serie/{slug}/{chapter_slug(n)}/", chapter_title(n)) for n in range(chapters, 0, -1)
+    ]
+    # Madara emits extra classes and stray whitespace in the class attribute on some entries
+    item_classes = ("wp-manga-chapter", "wp-manga-chapter has-thumb", "wp-manga-chapter    ")
+    items = "".join(
+        f'<li class="{item_classes[i % len(item_classes)]}"><a href="{url}">{name}</a>'
+        f'<span class="chapter-release-date"><i>Jan {i % 28 + 1}, 2024</i></span></li>'
+        for i, (url, name) in enumerate(entries)
+    )
+    summary = "<p>" + ("A long synopsis sentence. " * 60) + "</p>"
+    return (
+        PAGE_HEAD.format(title=title, nav=_nav())
+        + f'<div class="post-title"><h1>{title} <span class="manga-title-badges hot">HOT</span></h1></div>'
+        + f'<div class="summary__content">{summary}</div>'
+        + f'<div class="listing-chapters_wrap"><ul class="main version-chap">{items}</ul></div>'
+        + PAGE_FOOT
+    )
+
+def chapter_page(image_urls):
+    """Chapter reader page with lazy-loaded images."""
+    images = "".join(
+        f'<div class="page-break no-gaps"><img id="image-{i}" data-src="\n {url} " '
+        f'class="wp-manga-chapter-img img-responsive lazyload effect-fade"></div>'
+        for i, url in enumerate(image_urls)
+    )
+    comments = "".join(f'<div class="comment"><p>Comment {i}</p></div>' for i in range(100))
+    return (
+        PAGE_HEAD.format(title="Chapter", nav=_nav())
+        + f'<div class="reading-content">{images}</div><div class="comments">{comments}</div>'
+        + PAGE_FOOT
+    )
+
+def load_saved_pages():
+    """Returns saved fixture pages from `benchmarks/fixtures/` keyed by file name ({kind}*.html)."""
+    pages = {}
+    if os.path.isdir(FIXTURES_DIR):
+        for name in sorted(os.listdir(FIXTURES_DIR)):
+            if name.endswith(".html"):
+                with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+                    pages[name] = f.read()
+    return pages
@@ -0,0 +1,210 @@
+"""
+Local stand-in for toonily.com and its image CDN, for reproducible end-to-end benchmarks.
+
+Serves search, series and chapter pages (recorded pages from benchmarks/fixtures/ when
+present, synthetic ones otherwise) and synthetic JPEG pages, with optional per-request
+latency, a per-connection bandwidth limit and an injected error rate.
+
+Usage: python -m benchmarks.mock_server [--port N] [--chapters N] [--images N] [--latency S] ...
+"""
+
+import argparse
+import io
+import random
+import re
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import fixtures
+
+SERIES_SLUG = "bench-series"
+SERIES_TITLE = "Bench Series"
+
+SERIES_RE = re.compile(r"^/serie/([^/]+)/?$")
+CHAPTER_RE = re.compile(r"^/serie/([^/]+)/chapter-(\d+)/?$")
+IMAGE_RE = re.compile(r"^/img/([^/]+)/(\d+)/(\d+)\.jpg$")
+SEARCH_RE = re.compile(r"^/search/([^/]+)/?$")
+DATA_SRC_RE = re.compile(r'data-src="\s*https?://[^"\s]+\s*"')
+
+def _base_jpeg(width, height):
+    """A baseline JPEG strip; gradient plus noise, so it is about as large as a real page."""
+    from PIL import Image
+
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.blend(gradient, Image.effect_noise((width, height), 40), 0.5).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections at the end of a run are expected
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+class MockToonily:
+    """
+    Threaded HTTP server. Pages are served from `html_base` (127.0.0.1) and images from
+    `image_base` (localhost), so the client budgets them as separate hosts like the live site.
+    """
+
+    def __init__(self, port=0, chapters=20, images_per_chapter=30, image_size=(800, 2400),
+                 latency=0.0, bandwidth=None, error_rate=0.0, seed=1):
+        self.chapters = chapters
+        self.images_per_chapter = images_per_chapter
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.base_image = _base_jpeg(*image_size)
+        self.saved_pages = fixtures.load_saved_pages()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.stats_lock = threading.Lock()
+
+        handler = type("Handler", (_Handler,), {"mock": self})
+        self.server = _Server(("127.0.0.1", port), handler)
+        self.port = self.server.server_address[1]
+        self.html_base = f"http://127.0.0.1:{self.port}"
+        self.image_base = f"http://localhost:{self.port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-toonily", daemon=True)
+
+    @property
+    def series_url(self):
+        return f"{self.html_base}/serie/{SERIES_SLUG}/"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self.random_lock:
+            return self.random.random() < self.error_rate
+
+    def _saved(self, kind):
+        """A recorded page of `kind`, with links pointed at this server."""
+        for name, html in self.saved_pages.items():
+            if name.startswith(kind):
+                return re.sub(r"https?://(?:www\.)?toonily\.com", self.html_base, html)
+        return None
+
+    def chapter_html(self, slug, chapter):
+        """A chapter page whose images point at this server (recorded markup when available)."""
+        saved = self._saved("chapter")
+        if saved:
+            counter = iter(range(1, 100000))
+            return DATA_SRC_RE.sub(
+                lambda m: f'data-src="{self.image_base}/img/{slug}/{chapter}/{next(counter):03d}.jpg"', saved)
+        image_urls = [f"{self.image_base}/img/{slug}/{chapter}/{i:03d}.jpg" for i in range(1, self.images_per_chapter + 1)]
+        return fixtures.chapter_page(image_urls)
+
+    def image(self, slug, chapter, index):
+        """The base strip with a unique JPEG comment, so every URL has distinct content."""
+        comment = f"{slug}/{chapter}/{index}".encode("ascii")
+        return self.base_image[:2] + b"\xff\xfe" + struct.pack(">H", len(comment) + 2) + comment + self.base_image[2:]
+
+    def route(self, path):
+        """Returns (status, content type, body) for a request path."""
+        match = IMAGE_RE.match(path)
+        if match:
+            slug, chapter, index = match.group(1), int(match.group(2)), int(match.group(3))
+            return 200, "image/jpeg", self.image(slug, chapter, index)
+
+        match = CHAPTER_RE.match(path)
+        if match:
+            slug, chapter = match.group(1), int(match.group(2))
+            return 200, "text/html; charset=UTF-8", self.chapter_html(slug, chapter).encode("utf-8")
+
+        match = SERIES_RE.match(path)
+        if match:
+            # The synthetic series is always available; any other slug gets the recorded page if there is one
+            html = self._saved("series") if match.group(1) != SERIES_SLUG else None
+            html = html or fixtures.series_page(self.html_base, match.group(1), SERIES_TITLE, self.chapters)
+            return 200, "text/html; charset=UTF-8", html.encode("utf-8")
+
+        match = SEARCH_RE.match(path)
+        if match:
+            html = self._saved("search") or fixtures.search_page(self.html_base, match.group(1))
+            return 200, "text/html; charset=UTF-8", html.encode("utf-8")
+
+        return 404, "text/plain", b"Not found"
+
+class _Handler(BaseHTTPRequestHandler):
+    mock = None
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        mock = self.mock
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        if mock.should_fail():
+            status, content_type, body = 503, "text/plain", b"Service Unavailable"
+        else:
+            status, content_type, body = mock.route(self.path.split("?", 1)[0])
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self._write_body(body)
+
+        with mock.stats_lock:
+            mock.requests += 1
+            mock.bytes_sent += len(body)
+            if status >= 500:
+                mock.errors += 1
+
+    def _write_body(self, body):
+        bandwidth = self.mock.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        # Paced in 10 ms slices to cap this connection at `bandwidth` bytes per second
+        slice_size = max(int(bandwidth / 100), 1)
+        for offset in range(0, len(body), slice_size):
+            self.wfile.write(body[offset:offset + slice_size])
+            time.sleep(0.01)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--chapters", type=int, default=20)
+    arg_parser.add_argument("--images", type=int, default=30, help="Images per chapter.")
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    arg_parser.add_argument("--bandwidth", type=float, default=None, help="Bytes per second per connection.")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    args = arg_parser.parse_args()
+
+    mock = MockToonily(args.port, args.chapters, args.images, latency=args.latency,
+                       bandwidth=args.bandwidth, error_rate=args.error_rate)
+    print(f"Serving {mock.series_url} (Ctrl+C to stop)")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import sys
+import threading
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QLineEdit, QPushButton, 
     QTextEdit, QLabel, QHBoxLayout, QTableWidget, QTableWidgetItem, QMessageBox,
@@ -8,10 +9,19 @@ from PyQt6.QtCore import Qt, QUrl, QThread, pyqtSignal
 from PyQt6.QtGui import QDesktopServices, QPalette, QColor
 
 from scraper.fetcher import fetch_html
-from scraper.parser import parse_manga_details, parse_chapter_images, parse_search_results
-from scraper.downloader import download_chapter
-from utils.logger import log_info, log_error, log_success
-from utils.config import SEARCH_URL, DOWNLOAD_THREADS # Import DOWNLOAD_THREADS
+from scraper.parser import parse_search_results
+from scraper.blob_store import get_blob_store
+from scraper.cache import get_http_cache
+from scraper.details import get_manga_details
+from scraper.pipeline import DownloadPipeline
+from scraper.retry import start_retry_budget
+from scraper.scheduler import get_scheduler
+from scraper.selection import ChapterIndex, SELECTION_HELP
+from utils.conversion import ConversionStage
+from utils.transcoder import transcode_summary, transcoding_enabled
+from utils.logger import add_log_sink, flush_logs, log_info, remove_log_sink
+from utils.metrics import start_metrics, write_run_report
+from utils.config import SEARCH_URL
 
 # --- Chapter Selection Dialog ---
 class ChapterSelectionDialog(QDialog):
@@ -28,17 +38,43 @@ class ChapterSelectionDialog(QDialog):
         self.layout.addWidget(self.chapters_scroll_area)
 
         self.selected_chapters = []
-
+        self.chapter_index = ChapterIndex(chapters)
+
+        # Same selection expressions as the CLI
+        selection_layout = QHBoxLayout()
+        self.selection_input = QLineEdit()
+        self.selection_input.setPlaceholderText(SELECTION_HELP)
+        self.selection_input.returnPressed.connect(self.apply_selection)
+        selection_layout.addWidget(self.selection_input)
+        self.apply_selection_button = QPushButton("Apply")
+        self.apply_selection_button.clicked.connect(self.apply_selection)
+        selection_layout.addWidget(self.apply_selection_button)
+        self.layout.insertLayout(0, selection_layout)
+
+        self.checkboxes = {}
         for chapter in chapters:
-            checkbox = QCheckBox(f"Chapter {chapter['number']}: {chapter['title']}")
+            checkbox = QCheckBox(f"Chapter {chapter.label}: {chapter.title}")
             checkbox.setProperty("chapter_data", chapter)
             self.chapters_layout.addWidget(checkbox)
+            self.checkboxes[id(chapter)] = checkbox
 
         self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         self.button_box.accepted.connect(self.accept)
         self.button_box.rejected.connect(self.reject)
         self.layout.addWidget(self.button_box)
 
+    def apply_selection(self):
+        expression = self.selection_input.text().strip()
+        if not expression:
+            return
+        try:
+            selected = {id(chapter) for chapter in self.chapter_index.select(expression)}
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Selection", str(e))
+            return
+        for chapter_id, checkbox in self.checkboxes.items():
+            checkbox.setChecked(chapter_id in selected)
+
     def get_selected_chapters(self):
         selected = []
         for i in range(self.chapters_layout.count()):
@@ -55,25 +91,35 @@ class ScraperThread(QThread):
     download_finished = pyqtSignal(str) # When all downloads are done
     error_occurred = pyqtSignal(str)
     overall_progress = pyqtSignal(int) # For overall download progress (percentage)
+    log_batch = pyqtSignal(list) # Batches of log lines from the download workers
 
-    def __init__(self, url, chapters_to_download=None, create_pdf=False, delete_images=False):
+    def __init__(self, url, chapters_to_download=None, create_pdf=False, delete_images=False, output_format="images", manga_details=None):
         super().__init__()
         self.url = url
+        self.manga_details = manga_details # Already parsed by MangaDetailsFetcher, if available
         self.chapters_to_download = chapters_to_download
         self.create_pdf = create_pdf
         self.delete_images = delete_images
+        self.output_format = output_format
 
     def run(self):
+        # Worker log lines reach the window in batches instead of one signal per line.
+        # Each access to a PyQt signal's emit is a new bound object, so keep the registered one
+        sink = add_log_sink(self.log_batch.emit)
         try:
-            log_info(f"Starting to scrape: {self.url}")
-            html = fetch_html(self.url)
-            if not html:
-                self.error_occurred.emit("Could not retrieve manga page. Exiting.")
-                return
+            self._scrape()
+        finally:
+            remove_log_sink(sink)
 
-            manga_details = parse_manga_details(html)
+    def _scrape(self):
+        try:
+            log_info(f"Starting to scrape: {self.url}")
+            retry_budget = start_retry_budget()
+            start_metrics()
+            # Reuse the details parsed when the chapters were listed instead of fetching the page again
+            manga_details = self.manga_details or get_manga_details(self.url)
             if not manga_details:
-                self.error_occurred.emit("Could not parse manga details. Exiting.")
+                self.error_occurred.emit("Could not retrieve or parse manga details. Exiting.")
                 return
 
             self.manga_details_fetched.emit(manga_details)
@@ -85,38 +131,50 @@ class ScraperThread(QThread):
 
             chapters_to_process = self.chapters_to_download if self.chapters_to_download is not None else chapters
             total_chapters = len(chapters_to_process)
+
+            # Every chapter and image request below draws from the shared request budget
+            scheduler = get_scheduler()
+            self.chapter_progress.emit(f"Request budget: {scheduler.max_in_flight} concurrent requests")
             
-            from concurrent.futures import ThreadPoolExecutor
-            
+            converter = ConversionStage() if self.create_pdf or transcoding_enabled() else None
             completed_chapters = 0
-            def download_chapter_wrapper(chapter):
+            progress_lock = threading.Lock()
+
+            def chapter_done(chapter, status):
                 nonlocal completed_chapters
-                chapter_title = chapter["title"]
-                chapter_url = chapter["url"]
-                
-                self.chapter_progress.emit(f"Processing chapter: {chapter_title}")
-
-                chapter_html = fetch_html(chapter_url)
-                if not chapter_html:
-                    self.chapter_progress.emit(f"Skipping chapter {chapter_title} (could not fetch)")
-                    return
-
-                image_urls = parse_chapter_images(chapter_html)
-                if not image_urls:
-                    self.chapter_progress.emit(f"Skipping chapter {chapter_title} (no images found)")
-                    return
-
-                download_chapter(chapter_title, image_urls, manga_details["title"], chapter_url, self.create_pdf, self.delete_images)
-                self.chapter_progress.emit(f"Finished downloading chapter: {chapter_title}")
-                
-                completed_chapters += 1
-                progress_percentage = int((completed_chapters / total_chapters) * 100)
+                with progress_lock:
+                    completed_chapters += 1
+                    progress_percentage = int((completed_chapters / total_chapters) * 100)
                 self.overall_progress.emit(progress_percentage)
 
-
-            with ThreadPoolExecutor(max_workers=DOWNLOAD_THREADS) as executor:
-                executor.map(download_chapter_wrapper, chapters_to_process)
-
+            try:
+                # Chapter pages are resolved ahead while the image workers keep downloading
+                pipeline = DownloadPipeline(
+                    manga_details["title"], self.create_pdf, self.delete_images, converter, self.output_format,
+                    on_chapter_done=chapter_done,
+                )
+                pipeline.run(chapters_to_process)
+                flush_logs()
+                self.chapter_progress.emit(pipeline.summary())
+                if converter:
+                    self.chapter_progress.emit(f"Waiting for {converter.queue_depth()} conversions...")
+            finally:
+                # Also on errors, so the pool's worker processes never outlive the download
+                if converter:
+                    converter.close()
+            if converter:
+                self.chapter_progress.emit(converter.summary())
+
+            self.chapter_progress.emit(retry_budget.summary())
+            cache = get_http_cache()
+            if cache:
+                self.chapter_progress.emit(cache.summary())
+            store = get_blob_store()
+            if store:
+                self.chapter_progress.emit(store.summary())
+            if transcoding_enabled():
+                self.chapter_progress.emit(transcode_summary())
+            self.chapter_progress.emit(f"Run report written to {write_run_report()}")
             self.download_finished.emit("All selected chapters downloaded!")
 
         except Exception as e:
@@ -304,6 +362,11 @@ class MainWindow(QMainWindow):
         self.pdf_checkbox.stateChanged.connect(self.delete_images_checkbox.setEnabled)
         self.download_options_layout.addWidget(self.delete_images_checkbox)
 
+        self.cbz_checkbox = QCheckBox("Save as CBZ archive (instead of image folders)")
+        self.cbz_checkbox.stateChanged.connect(lambda state: self.pdf_checkbox.setEnabled(not state))
+        self.pdf_checkbox.stateChanged.connect(lambda state: self.cbz_checkbox.setEnabled(not state))
+        self.download_options_layout.addWidget(self.cbz_checkbox)
+
         self.download_button = QPushButton("Download Selected Chapters")
         self.download_button.clicked.connect(self.start_download)
         self.download_options_layout.addWidget(self.download_button)
@@ -330,6 +393,9 @@ class MainWindow(QMainWindow):
         self.log_display.append(message)
         self.log_display.verticalScrollBar().setValue(self.log_display.verticalScrollBar().maximum()) # Auto-scroll to bottom
 
+    def append_logs(self, lines):
+        self.append_log("\n".join(lines))
+
     def perform_search(self):
         query = self.search_input.text().strip()
         if not query:
@@ -446,6 +512,7 @@ class MainWindow(QMainWindow):
 
         pdf_conversion = self.pdf_checkbox.isChecked()
         delete_after_pdf = self.delete_images_checkbox.isChecked()
+        output_format = "cbz" if self.cbz_checkbox.isChecked() else "images"
 
         self.append_log(f"Starting download for {len(self.selected_chapters_for_download)} chapters...")
         self.download_button.setEnabled(False) # Disable button during download
@@ -455,9 +522,12 @@ class MainWindow(QMainWindow):
             url=self.current_manga_url, # Use the stored URL
             chapters_to_download=self.selected_chapters_for_download,
             create_pdf=pdf_conversion,
-            delete_images=delete_after_pdf
+            delete_images=delete_after_pdf,
+            output_format=output_format,
+            manga_details=self.current_manga_details
         )
         self.scraper_thread.chapter_progress.connect(self.append_log)
+        self.scraper_thread.log_batch.connect(self.append_logs)
         self.scraper_thread.overall_progress.connect(self.progress_bar.setValue) # Connect progress signal
         self.scraper_thread.download_finished.connect(self.on_download_finished)
         self.scraper_thread.error_occurred.connect(self.on_scraper_error)
@@ -487,14 +557,9 @@ class MangaDetailsFetcher(QThread):
 
     def run(self):
         try:
-            html = fetch_html(self.url)
-            if not html:
-                self.error_occurred.emit("Could not retrieve manga page. Exiting.")
-                return
-
-            manga_details = parse_manga_details(html)
+            manga_details = get_manga_details(self.url)
             if not manga_details:
-                self.error_occurred.emit("Could not parse manga details.")
+                self.error_occurred.emit("Could not retrieve or parse manga details.")
                 return
             self.manga_details_fetched.emit(manga_details)
         except Exception as e:
@@ -3,6 +3,7 @@
 """
 
 import sys
+from contextlib import contextmanager
 import typer
 from rich.console import Console
 from rich.table import Table
@@ -10,14 +11,33 @@ from rich.prompt import Prompt
 from PyQt6.QtWidgets import QApplication # Import QApplication
 
 from scraper.fetcher import fetch_html
-from scraper.parser import parse_manga_details, parse_chapter_images, parse_search_results
-from scraper.downloader import download_chapter
-from utils.logger import log_info, log_error, log_success
+from scraper.parser import parse_search_results
+from scraper.blob_store import get_blob_store
+from scraper.cache import get_http_cache
+from scraper.details import get_manga_details
+from scraper.job_queue import JobQueue, parse_job_file
+from scraper.worker import expand_job, run_workers
+from scraper.downloader import should_skip_chapter
+from scraper.manifest import ChapterManifest, is_chapter_complete
+from scraper.pipeline import DownloadPipeline, PRIORITY_POLICIES
+from scraper.library import LibraryIndex
+from scraper.retry import start_retry_budget
+from scraper.scheduler import configure_scheduler
+from scraper.selection import ChapterIndex, SELECTION_HELP
+from utils.conversion import ConversionStage
+from utils.logger import flush_logs, log_info, log_error, log_success
+from utils.metrics import MetricsExporter, start_metrics, write_run_report
+from utils.transcoder import check_transcode_format, transcode_chapter, transcode_summary, transcoding_enabled
 from utils.config import SEARCH_URL
 
 app = typer.Typer()
 console = Console()
 
+def _ask(*args, **kwargs):
+    """Prompts the user once every pending log line has been printed."""
+    flush_logs()
+    return Prompt.ask(*args, **kwargs)
+
 def _search_manga(query: str):
     """Helper function to search for a manga and return results."""
     log_info(f"Searching for: {query}")
@@ -41,21 +61,19 @@ def _search_manga(query: str):
     for i, result in enumerate(results, 1):
         table.add_row(str(i), result['title'], result['url'])
 
+    flush_logs()
     console.print(table)
     return results
 
-def _scrape_manga(url: str, chapters_to_process: str = None, create_pdf: bool = False, delete_images: bool = False):
+def _scrape_manga(url: str, chapters_to_process: str = None, create_pdf: bool = False, delete_images: bool = False, engine: str = "threads", output_format: str = "images"):
     """Helper function to scrape and download a manga."""
     log_info(f"Starting to scrape: {url}")
+    retry_budget = start_retry_budget()
+    start_metrics()
 
-    html = fetch_html(url)
-    if not html:
-        log_error("Could not retrieve manga page. Exiting.")
-        return
-
-    manga_details = parse_manga_details(html)
+    manga_details = get_manga_details(url)
     if not manga_details:
-        log_error("Could not parse manga details. Exiting.")
+        log_error("Could not retrieve or parse manga details. Exiting.")
         return
 
     manga_title = manga_details["title"]
@@ -72,103 +90,313 @@ def _scrape_manga(url: str, chapters_to_process: str = None, create_pdf: bool =
     table.add_column("URL", style="green")
 
     for chapter in chapters:
-        table.add_row(str(chapter["number"]), chapter["title"], chapter["url"])
+        table.add_row(chapter.label, chapter.title, chapter.url)
 
+    flush_logs()
     console.print(table)
 
     chapters_to_download = []
+    chapter_index = ChapterIndex(chapters)
 
     if chapters_to_process is None:
         while True:
-            selection = typer.prompt("Enter chapter numbers to download (e.g., 1,5-7,all) or 'q' to quit")
+            selection = typer.prompt(f"Enter chapters to download ({SELECTION_HELP}) or 'q' to quit")
             if selection.lower() == 'q':
                 break
-            
-            if selection.lower() == 'all':
-                chapters_to_download = chapters
+
+            try:
+                chapters_to_download = chapter_index.select(selection)
                 break
-            else:
-                try:
-                    parts = selection.split(',')
-                    temp_chapters = []
-                    valid_selection = True
-                    for part in parts:
-                        if '-' in part:
-                            start_str, end_str = part.split('-')
-                            start = float(start_str)
-                            end = float(end_str)
-                            selected_range = [c for c in chapters if start <= c["number"] <= end]
-                            temp_chapters.extend(selected_range)
-                        else:
-                            target_chapter_num = float(part)
-                            found_chapter = next((c for c in chapters if c["number"] == target_chapter_num), None)
-                            if found_chapter:
-                                temp_chapters.append(found_chapter)
-                            else:
-                                log_error(f"Chapter {part} not found. Please enter a valid chapter number or range.")
-                                valid_selection = False
-                                break
-                    if valid_selection:
-                        chapters_to_download = temp_chapters
-                        break
-                except ValueError:
-                    log_error("Invalid selection format. Please use numbers and ranges (e.g., 1, 5-7, 10.5).")
-                    continue
+            except ValueError as e:
+                log_error(f"{e} Please try again.")
+                continue
     else:
-        if chapters_to_process.lower() == 'all':
-            chapters_to_download = chapters
-        else:
-            try:
-                parts = chapters_to_process.split(',')
-                for part in parts:
-                    if '-' in part:
-                        start_str, end_str = part.split('-')
-                        start = float(start_str)
-                        end = float(end_str)
-                        selected_range = [c for c in chapters if start <= c["number"] <= end]
-                        chapters_to_download.extend(selected_range)
-                    else:
-                        target_chapter_num = float(part)
-                        found_chapter = next((c for c in chapters if c["number"] == target_chapter_num), None)
-                        if found_chapter:
-                            chapters_to_download.append(found_chapter)
-                        else:
-                            log_error(f"Chapter {part} not found. Exiting.")
-                            return
-            except ValueError:
-                log_error("Invalid chapter selection format provided. Exiting.")
-                return
+        try:
+            chapters_to_download = chapter_index.select(chapters_to_process)
+        except ValueError as e:
+            log_error(f"{e} Exiting.")
+            return
 
     if not chapters_to_download:
         log_info("No chapters selected for download. Exiting.")
         return
 
-    from concurrent.futures import ThreadPoolExecutor
-    from utils.config import DOWNLOAD_THREADS
+    _download_chapters(manga_title, chapters_to_download, create_pdf, delete_images, engine, output_format)
 
-    def download_chapter_wrapper(chapter):
-        chapter_title = chapter["title"]
-        chapter_url = chapter["url"]
-        
-        log_info(f"Processing chapter: {chapter_title}")
+    # Register the series so later `sync` runs only fetch newer chapters
+    library = LibraryIndex()
+    library.record_chapters(url, manga_title, [c for c in chapters_to_download if should_skip_chapter(manga_title, c.title, create_pdf, output_format)])
+    library.save()
 
-        chapter_html = fetch_html(chapter_url)
-        if not chapter_html:
-            log_error(f"Skipping chapter {chapter_title} (could not fetch)")
-            return
+    log_success("All selected chapters downloaded!")
+    _log_run_summary(retry_budget)
+
+def _log_run_summary(retry_budget):
+    """Helper function that logs retry, cache, image store and transcoding statistics and writes the run report."""
+    log_info(retry_budget.summary())
+    cache = get_http_cache()
+    if cache:
+        log_info(cache.summary())
+    store = get_blob_store()
+    if store:
+        log_info(store.summary())
+    if transcoding_enabled():
+        log_info(transcode_summary())
+    log_info(f"Run report written to {write_run_report()}")
+
+def _download_chapters(manga_title: str, chapters_to_download: list, create_pdf: bool = False, delete_images: bool = False, engine: str = "threads", output_format: str = "images"):
+    """Helper function to download a list of chapters of one manga with the selected engine."""
+    # PDF conversion and transcoding run in their own process pool so downloads are never blocked on Pillow
+    converter = ConversionStage() if create_pdf or transcoding_enabled() else None
+    try:
+        if engine == "async":
+            from scraper.async_engine import run_async_download
+            run_async_download(manga_title, chapters_to_download, create_pdf, delete_images, converter, output_format)
+        else:
+            _download_chapters_threaded(manga_title, chapters_to_download, create_pdf, delete_images, converter, output_format)
+    finally:
+        if converter:
+            converter.close()
+
+def _download_chapters_threaded(manga_title: str, chapters_to_download: list, create_pdf: bool, delete_images: bool, converter=None, output_format: str = "images"):
+    """Helper function that downloads chapters with the threaded engine."""
+    pipeline = DownloadPipeline(manga_title, create_pdf, delete_images, converter, output_format)
+    pipeline.run(chapters_to_download)
+    log_info(pipeline.summary())
+
+def _check_series_for_updates(url: str, library: LibraryIndex, create_pdf: bool = False, output_format: str = "images"):
+    """Helper function that fetches a series page and returns its title and the chapters not yet on disk."""
+    # Always check with the server so newly released chapters are never hidden by the cache
+    manga_details = get_manga_details(url, refresh=True)
+    if not manga_details:
+        log_error(f"Could not retrieve or parse manga details: {url}")
+        return None
 
-        image_urls = parse_chapter_images(chapter_html)
-        if not image_urls:
-            log_error(f"Skipping chapter {chapter_title} (no images found)")
-            return
+    manga_title = manga_details["title"]
+    known_urls = library.known_chapter_urls(url)
+    new_chapters = []
+    already_on_disk = []
+    for chapter in manga_details["chapters"]:
+        if chapter.url in known_urls:
+            continue
+        # Chapters downloaded with `scrape` before the series was synced are picked up from their manifests
+        if should_skip_chapter(manga_title, chapter.title, create_pdf, output_format):
+            already_on_disk.append(chapter)
+        else:
+            new_chapters.append(chapter)
 
-        download_chapter(chapter_title, image_urls, manga_title, chapter_url, create_pdf, delete_images)
-        log_success(f"Finished downloading chapter: {chapter_title}")
+    library.record_chapters(url, manga_title, already_on_disk)
+    return manga_title, new_chapters
 
-    with ThreadPoolExecutor(max_workers=DOWNLOAD_THREADS) as executor:
-        executor.map(download_chapter_wrapper, chapters_to_download)
+def _sync_library(urls: list[str], create_pdf: bool = False, delete_images: bool = False, engine: str = "threads", output_format: str = "images"):
+    """Helper function that downloads only newly released chapters of each series."""
+    from concurrent.futures import ThreadPoolExecutor
+    from utils.config import SYNC_THREADS
+
+    retry_budget = start_retry_budget()
+    start_metrics()
+    library = LibraryIndex()
+    urls = urls or library.series_urls()
+    if not urls:
+        log_error("No series to sync. Pass series URLs or scrape a series first.")
+        return
 
-    log_success("All selected chapters downloaded!")
+    log_info(f"Checking {len(urls)} series for new chapters...")
+    with ThreadPoolExecutor(max_workers=SYNC_THREADS) as executor:
+        updates = list(executor.map(lambda url: _check_series_for_updates(url, library, create_pdf, output_format), urls))
+
+    for url, update in zip(urls, updates):
+        if update is None:
+            continue
+        manga_title, new_chapters = update
+        if not new_chapters:
+            log_info(f"{manga_title}: up to date")
+            library.record_chapters(url, manga_title, [])
+            continue
+
+        log_info(f"{manga_title}: {len(new_chapters)} new chapters")
+        _download_chapters(manga_title, new_chapters, create_pdf, delete_images, engine, output_format)
+        completed = [c for c in new_chapters if should_skip_chapter(manga_title, c.title, create_pdf, output_format)]
+        library.record_chapters(url, manga_title, completed)
+        library.save()
+
+    library.save()
+    log_success("Library sync finished!")
+    _log_run_summary(retry_budget)
+
+def _run_batch_job(job_queue: JobQueue, job, library: LibraryIndex, converter=None):
+    """Helper function that downloads the unfinished chapters of one queued series and records their outcome."""
+    job_id = job["id"]
+    expanded = expand_job(job_queue, job)
+    if expanded is None:
+        return
+
+    manga_title, series_chapters = expanded
+    # The queue keeps the chapters selected by the first run, so resumed jobs download exactly those
+    by_url = {chapter.url: chapter for chapter in series_chapters}
+    selected = [by_url[url] for url in job_queue.chapter_urls(job_id) if url in by_url]
+    pending = [by_url[url] for url in job_queue.pending_chapter_urls(job_id) if url in by_url]
+    create_pdf, output_format = bool(job["create_pdf"]), job["output_format"]
+    log_info(f"{manga_title}: {len(pending)} chapters to download")
+
+    if pending:
+        pipeline = DownloadPipeline(
+            manga_title, create_pdf, bool(job["delete_images"]), converter, output_format,
+            on_chapter_done=lambda chapter, status: job_queue.chapter_finished(job_id, chapter.url, status),
+        )
+        pipeline.run(pending)
+        log_info(f"{manga_title}: {pipeline.summary()}")
+
+    library.record_chapters(job["url"], manga_title, [c for c in selected if should_skip_chapter(manga_title, c.title, create_pdf, output_format)])
+    library.save()
+    status = job_queue.finish_job(job_id)
+    (log_success if status == "done" else log_error)(f"{manga_title}: job {status}")
+
+def _run_batch(job_queue: JobQueue, series: int):
+    """Helper function that runs every unfinished job in the queue, `series` of them at a time."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    retry_budget = start_retry_budget()
+    start_metrics()
+    jobs = job_queue.pending_jobs()
+    if not jobs:
+        log_info("No unfinished jobs in the queue.")
+        return
+
+    log_info(f"Running {len(jobs)} jobs, {series} series at a time...")
+    converter = ConversionStage() if transcoding_enabled() or any(job["create_pdf"] for job in jobs) else None
+    # One index for the whole batch, so concurrent jobs never overwrite each other's entries
+    library = LibraryIndex()
+    try:
+        # All series share the process-wide request scheduler, so --max-requests caps the whole batch
+        with ThreadPoolExecutor(max_workers=series) as executor:
+            for job, future in [(job, executor.submit(_run_batch_job, job_queue, job, library, converter)) for job in jobs]:
+                try:
+                    future.result()
+                except Exception as e:
+                    job_queue.finish_job(job["id"], error=str(e))
+                    log_error(f"Job {job['id']} ({job['url']}) failed: {e}")
+    finally:
+        if converter:
+            converter.close()
+
+    _print_batch_status(job_queue)
+    _log_run_summary(retry_budget)
+
+def _print_batch_status(job_queue: JobQueue):
+    """Helper function that prints every job in the queue with its chapter progress."""
+    table = Table(title="Batch Jobs")
+    table.add_column("ID", style="cyan")
+    table.add_column("Series", style="magenta")
+    table.add_column("Chapters", style="green")
+    table.add_column("Progress")
+    table.add_column("Status")
+
+    for row in job_queue.status():
+        status = row["status"] if not row["error"] else f"{row['status']}: {row['error']}"
+        progress = f"{row['finished'] or 0}/{row['chapters']}" if row["chapters"] else "-"
+        if row["leased"]:
+            progress += f" ({row['leased']} leased)"
+        table.add_row(str(row["id"]), row["title"] or row["url"], row["selection"], progress, status)
+
+    flush_logs()
+    console.print(table)
+
+def _transcode_library(titles: list[str]):
+    """Helper function that recompresses the pages of every complete chapter already in DOWNLOAD_DIR."""
+    import os
+    from utils.config import DOWNLOAD_DIR
+
+    start_metrics()
+    if not titles and os.path.isdir(DOWNLOAD_DIR):
+        # Dot-folders hold the image store and other internal data
+        titles = sorted(name for name in os.listdir(DOWNLOAD_DIR) if not name.startswith(".") and os.path.isdir(os.path.join(DOWNLOAD_DIR, name)))
+    chapters = 0
+    with ConversionStage() as converter:
+        for title in titles:
+            manga_folder = os.path.join(DOWNLOAD_DIR, title)
+            if not os.path.isdir(manga_folder):
+                log_error(f"No such series folder: {manga_folder}")
+                continue
+            for chapter_title in sorted(os.listdir(manga_folder)):
+                chapter_folder = os.path.join(manga_folder, chapter_title)
+                # Incomplete chapters are left alone until a rerun finishes them
+                if not is_chapter_complete(chapter_folder):
+                    continue
+                manifest = ChapterManifest(chapter_folder)
+                image_paths = [os.path.join(chapter_folder, entry["file"]) for entry in manifest.data["images"].values() if entry.get("file")]
+                transcode_chapter(f"{title} / {chapter_title}", manifest, image_paths, converter)
+                chapters += 1
+
+    log_success(f"Transcoded {chapters} chapters")
+    log_info(transcode_summary())
+    log_info(f"Run report written to {write_run_report()}")
+
+def _check_output_format(output_format: str, create_pdf: bool):
+    """Validates the --format option against --pdf."""
+    if output_format not in ("images", "cbz"):
+        log_error(f"Unknown format: {output_format}. Use 'images' or 'cbz'.")
+        raise typer.Exit(code=1)
+    if output_format == "cbz" and create_pdf:
+        log_error("--pdf cannot be combined with --format cbz.")
+        raise typer.Exit(code=1)
+
+def _check_transcode(transcode, create_pdf: bool = False, output_format: str = "images"):
+    """Validates the --transcode option against --pdf and --format."""
+    if not transcode:
+        return
+    error = check_transcode_format(transcode)
+    if error:
+        log_error(error)
+        raise typer.Exit(code=1)
+    if create_pdf or output_format == "cbz":
+        log_error("--transcode only applies to image folders; it cannot be combined with --pdf or --format cbz.")
+        raise typer.Exit(code=1)
+
+def _check_priority(priority):
+    """Validates the --priority option."""
+    if priority and priority not in PRIORITY_POLICIES:
+        log_error(f"Unknown priority: {priority}. Use one of: {', '.join(PRIORITY_POLICIES)}.")
+        raise typer.Exit(code=1)
+
+def _download_settings(threads, no_cache, priority=None, log_mode=None, report=None, transcode=None, quality=None):
+    """Maps the download options shared by scrape, sync, batch and worker to utils.config overrides."""
+    settings = {"DOWNLOAD_THREADS": threads, "HTTP_CACHE_ENABLED": not no_cache}
+    if priority:
+        settings["DOWNLOAD_PRIORITY"] = priority
+    if log_mode:
+        settings["LOG_MODE"] = log_mode
+    if report:
+        settings["METRICS_REPORT_PATH"] = report
+    if transcode:
+        settings["TRANSCODE_FORMAT"] = transcode
+    if quality is not None:
+        settings["TRANSCODE_QUALITY"] = quality
+    return settings
+
+def _apply_settings(settings):
+    """Applies utils.config overrides for this process."""
+    from utils import config
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+@contextmanager
+def _metrics_export(path):
+    """Rewrites the --metrics-file Prometheus file periodically while the block runs."""
+    if not path:
+        yield
+        return
+    exporter = MetricsExporter(path).start()
+    try:
+        yield
+    finally:
+        exporter.stop()
+
+def _check_log_mode(log_mode):
+    """Validates the --log-mode option."""
+    if log_mode and log_mode not in ("rich", "quiet", "json"):
+        log_error(f"Unknown log mode: {log_mode}. Use 'rich', 'quiet' or 'json'.")
+        raise typer.Exit(code=1)
 
 @app.command()
 def search(query: list[str]):
@@ -179,15 +407,168 @@ def search(query: list[str]):
 @app.command()
 def scrape(
     url: str,
-    chapters_to_process: str = typer.Argument(None, help="Chapter numbers to download (e.g., '1,5-7,all')"),
+    chapters_to_process: str = typer.Argument(None, help="Chapters to download (e.g., '1,5-7', '100-', '!5', 'latest 10', 'side', 'all')"),
     pdf: bool = typer.Option(False, "--pdf", help="Convert downloaded chapters to PDF."),
     delete: bool = typer.Option(False, "--delete", help="Delete images after PDF conversion."),
-    threads: int = typer.Option(5, "--threads", "-t", help="Number of download threads.")
+    threads: int = typer.Option(5, "--threads", "-t", help="Number of download threads."),
+    engine: str = typer.Option("threads", "--engine", "-e", help="Download engine: 'threads' or 'async'."),
+    output_format: str = typer.Option("images", "--format", help="Output format: 'images' (chapter folders) or 'cbz'."),
+    max_requests: int = typer.Option(None, "--max-requests", help="Global cap on concurrent requests (default from config)."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the on-disk HTTP page cache."),
+    priority: str = typer.Option(None, "--priority", help="Image order for the threaded engine: 'chapter', 'round-robin' or 'smallest'."),
+    log_mode: str = typer.Option(None, "--log-mode", help="Log output: 'rich', 'quiet' (errors only) or 'json' (one object per line)."),
+    transcode: str = typer.Option(None, "--transcode", help="Recompress downloaded pages to 'webp', 'avif' or 'jxl'."),
+    quality: int = typer.Option(None, "--quality", help="Encoder quality for --transcode, 0-100 (default from config)."),
+    report: str = typer.Option(None, "--report", help="Path of the JSON run report (default: a timestamped file in METRICS_REPORT_DIR)."),
+    metrics_file: str = typer.Option(None, "--metrics-file", help="Keep a Prometheus text file with live metrics updated during the run.")
 ):
     """Scrapes and downloads a manga from a Toonily URL."""
+    if engine not in ("threads", "async"):
+        log_error(f"Unknown engine: {engine}. Use 'threads' or 'async'.")
+        raise typer.Exit(code=1)
+    _check_output_format(output_format, pdf)
+    _check_transcode(transcode, pdf, output_format)
+    _check_priority(priority)
+    _check_log_mode(log_mode)
+    _apply_settings(_download_settings(threads, no_cache, priority, log_mode, report, transcode, quality))
+    configure_scheduler(max_requests)
+    with _metrics_export(metrics_file):
+        _scrape_manga(url, chapters_to_process, pdf, delete, engine, output_format)
+
+@app.command()
+def sync(
+    urls: list[str] = typer.Argument(None, help="Series URLs to sync. Defaults to every series in the library index."),
+    from_file: str = typer.Option(None, "--from-file", "-f", help="Read series URLs from a file, one per line."),
+    pdf: bool = typer.Option(False, "--pdf", help="Convert downloaded chapters to PDF."),
+    delete: bool = typer.Option(False, "--delete", help="Delete images after PDF conversion."),
+    threads: int = typer.Option(5, "--threads", "-t", help="Number of download threads."),
+    engine: str = typer.Option("threads", "--engine", "-e", help="Download engine: 'threads' or 'async'."),
+    output_format: str = typer.Option("images", "--format", help="Output format: 'images' (chapter folders) or 'cbz'."),
+    max_requests: int = typer.Option(None, "--max-requests", help="Global cap on concurrent requests (default from config)."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the on-disk HTTP page cache."),
+    priority: str = typer.Option(None, "--priority", help="Image order for the threaded engine: 'chapter', 'round-robin' or 'smallest'."),
+    log_mode: str = typer.Option(None, "--log-mode", help="Log output: 'rich', 'quiet' (errors only) or 'json' (one object per line)."),
+    transcode: str = typer.Option(None, "--transcode", help="Recompress downloaded pages to 'webp', 'avif' or 'jxl'."),
+    quality: int = typer.Option(None, "--quality", help="Encoder quality for --transcode, 0-100 (default from config)."),
+    report: str = typer.Option(None, "--report", help="Path of the JSON run report (default: a timestamped file in METRICS_REPORT_DIR)."),
+    metrics_file: str = typer.Option(None, "--metrics-file", help="Keep a Prometheus text file with live metrics updated during the run.")
+):
+    """Downloads only the chapters released since the last sync."""
+    if engine not in ("threads", "async"):
+        log_error(f"Unknown engine: {engine}. Use 'threads' or 'async'.")
+        raise typer.Exit(code=1)
+    _check_output_format(output_format, pdf)
+    _check_transcode(transcode, pdf, output_format)
+    _check_priority(priority)
+    _check_log_mode(log_mode)
+    series_urls = list(urls or [])
+    if from_file:
+        with open(from_file, "r", encoding="utf-8") as f:
+            series_urls.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    _apply_settings(_download_settings(threads, no_cache, priority, log_mode, report, transcode, quality))
+    configure_scheduler(max_requests)
+    with _metrics_export(metrics_file):
+        _sync_library(series_urls, pdf, delete, engine, output_format)
+
+@app.command()
+def batch(
+    job_file: str = typer.Argument(None, help="Job file with one series per line: '<url> [chapters]'. Omit to resume the queue."),
+    status: bool = typer.Option(False, "--status", help="Show the jobs in the queue and exit."),
+    enqueue_only: bool = typer.Option(False, "--enqueue-only", help="Queue the jobs in JOB_FILE for `worker` processes and exit."),
+    pdf: bool = typer.Option(False, "--pdf", help="Convert downloaded chapters to PDF (jobs added from JOB_FILE)."),
+    delete: bool = typer.Option(False, "--delete", help="Delete images after PDF conversion (jobs added from JOB_FILE)."),
+    output_format: str = typer.Option("images", "--format", help="Output format for jobs added from JOB_FILE: 'images' or 'cbz'."),
+    series: int = typer.Option(None, "--series", "-s", help="Series downloaded at once (default from config)."),
+    threads: int = typer.Option(5, "--threads", "-t", help="Number of download threads per series."),
+    queue_path: str = typer.Option(None, "--queue", help="Path of the job queue database (default: <DOWNLOAD_DIR>/jobs.sqlite3)."),
+    max_requests: int = typer.Option(None, "--max-requests", help="Global cap on concurrent requests (default from config)."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the on-disk HTTP page cache."),
+    priority: str = typer.Option(None, "--priority", help="Image order within each series: 'chapter', 'round-robin' or 'smallest'."),
+    log_mode: str = typer.Option(None, "--log-mode", help="Log output: 'rich', 'quiet' (errors only) or 'json' (one object per line)."),
+    transcode: str = typer.Option(None, "--transcode", help="Recompress downloaded pages to 'webp', 'avif' or 'jxl'."),
+    quality: int = typer.Option(None, "--quality", help="Encoder quality for --transcode, 0-100 (default from config)."),
+    report: str = typer.Option(None, "--report", help="Path of the JSON run report (default: a timestamped file in METRICS_REPORT_DIR)."),
+    metrics_file: str = typer.Option(None, "--metrics-file", help="Keep a Prometheus text file with live metrics updated during the run.")
+):
+    """Queues the series in a job file and downloads every unfinished job, resuming after crashes."""
+    from utils import config
+    _check_output_format(output_format, pdf)
+    _check_transcode(transcode, pdf, output_format)
+    _check_priority(priority)
+    _check_log_mode(log_mode)
+    job_queue = JobQueue(queue_path)
+    if status:
+        _print_batch_status(job_queue)
+        return
+
+    if job_file:
+        added = [job_queue.add_job(url, selection, pdf, delete, output_format) for url, selection in parse_job_file(job_file)]
+        log_info(f"Queued {sum(1 for job_id in added if job_id)} new jobs ({sum(1 for job_id in added if not job_id)} already in the queue)")
+    if enqueue_only:
+        flush_logs()
+        return
+
+    _apply_settings(_download_settings(threads, no_cache, priority, log_mode, report, transcode, quality))
+    configure_scheduler(max_requests)
+    with _metrics_export(metrics_file):
+        _run_batch(job_queue, series or config.BATCH_SERIES)
+
+@app.command()
+def transcode(
+    titles: list[str] = typer.Argument(None, help="Series folders in DOWNLOAD_DIR to transcode. Defaults to all of them."),
+    to: str = typer.Option("webp", "--to", help="Target format: 'webp', 'avif' or 'jxl'."),
+    quality: int = typer.Option(None, "--quality", help="Encoder quality, 0-100 (default from config)."),
+    min_saving: float = typer.Option(None, "--min-saving", help="Keep pages whose copy would be less than this fraction smaller (default from config)."),
+    workers: int = typer.Option(None, "--workers", help="Transcoding processes (default: CPU count)."),
+    log_mode: str = typer.Option(None, "--log-mode", help="Log output: 'rich', 'quiet' (errors only) or 'json' (one object per line)."),
+    report: str = typer.Option(None, "--report", help="Path of the JSON run report (default: a timestamped file in METRICS_REPORT_DIR).")
+):
+    """Recompresses the pages of chapters already downloaded, to save storage."""
+    from utils import config
+    _check_transcode(to)
+    _check_log_mode(log_mode)
+    config.TRANSCODE_FORMAT = to
+    if quality is not None:
+        config.TRANSCODE_QUALITY = quality
+    if min_saving is not None:
+        config.TRANSCODE_MIN_SAVING = min_saving
+    if workers:
+        config.CONVERSION_WORKERS = workers
+    if log_mode:
+        config.LOG_MODE = log_mode
+    if report:
+        config.METRICS_REPORT_PATH = report
+    _transcode_library(titles)
+
+@app.command()
+def worker(
+    processes: int = typer.Option(None, "--processes", "-p", help="Worker processes on this host (default from config)."),
+    queue_path: str = typer.Option(None, "--queue", help="Path of the shared job queue database (default: <DOWNLOAD_DIR>/jobs.sqlite3)."),
+    threads: int = typer.Option(5, "--threads", "-t", help="Number of download threads per process."),
+    max_requests: int = typer.Option(None, "--max-requests", help="Cap on concurrent requests per process (default from config)."),
+    lease: int = typer.Option(None, "--lease", help="Seconds before a silent worker's chapters are reclaimed (default from config)."),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Bypass the on-disk HTTP page cache."),
+    priority: str = typer.Option(None, "--priority", help="Image order within each claim: 'chapter', 'round-robin' or 'smallest'."),
+    log_mode: str = typer.Option(None, "--log-mode", help="Log output: 'rich', 'quiet' (errors only) or 'json' (one object per line)."),
+    transcode: str = typer.Option(None, "--transcode", help="Recompress downloaded pages to 'webp', 'avif' or 'jxl'."),
+    quality: int = typer.Option(None, "--quality", help="Encoder quality for --transcode, 0-100 (default from config)."),
+    report: str = typer.Option(None, "--report", help="Base path of the JSON run reports; each process adds its worker id.")
+):
+    """Claims and downloads chapters from the shared job queue until it is drained (run on one or more hosts)."""
     from utils import config
-    config.DOWNLOAD_THREADS = threads
-    _scrape_manga(url, chapters_to_process, pdf, delete)
+    _check_priority(priority)
+    _check_log_mode(log_mode)
+    _check_transcode(transcode)
+    # Passed to each process explicitly, since spawned processes do not inherit config changes
+    settings = _download_settings(threads, no_cache, priority, log_mode, report, transcode, quality)
+    settings["BASE_URL"] = config.BASE_URL
+    if lease:
+        settings["WORKER_LEASE_SECONDS"] = lease
+    _apply_settings(settings)
+
+    JobQueue(queue_path).close()  # create or migrate the database once, before the workers race to open it
+    run_workers(processes or config.WORKER_PROCESSES, queue_path, settings, max_requests)
+    _print_batch_status(JobQueue(queue_path))
 
 def interactive_mode():
     """Starts the interactive mode for the scraper."""
@@ -199,24 +580,24 @@ def interactive_mode():
         console.print("2. Enter a manga URL")
         console.print("3. Exit")
         
-        choice = Prompt.ask("[bold cyan]Enter your choice (1-3)[/bold cyan]", choices=["1", "2", "3"], default="1")
+        choice = _ask("[bold cyan]Enter your choice (1-3)[/bold cyan]", choices=["1", "2", "3"], default="1")
 
         if choice == "1":
-            query = Prompt.ask("[bold cyan]Enter the manga title to search for[/bold cyan]")
+            query = _ask("[bold cyan]Enter the manga title to search for[/bold cyan]")
             results = _search_manga(query)
             if results:
                 while True:
-                    selection = Prompt.ask("\n[bold cyan]Enter the number of the manga to scrape (or 'q' to quit)[/bold cyan]")
+                    selection = _ask("\n[bold cyan]Enter the number of the manga to scrape (or 'q' to quit)[/bold cyan]")
                     if selection.lower() == 'q':
                         break
                     try:
                         selection_index = int(selection) - 1
                         if 0 <= selection_index < len(results):
                             selected_manga = results[selection_index]
-                            pdf_choice = Prompt.ask("[bold cyan]Convert to PDF? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
+                            pdf_choice = _ask("[bold cyan]Convert to PDF? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
                             delete_choice = "n"
                             if pdf_choice.lower() == 'y':
-                                delete_choice = Prompt.ask("[bold cyan]Delete images after PDF conversion? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
+                                delete_choice = _ask("[bold cyan]Delete images after PDF conversion? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
                             _scrape_manga(selected_manga['url'], create_pdf=(pdf_choice.lower() == 'y'), delete_images=(delete_choice.lower() == 'y'))
                             break
                         else:
@@ -225,11 +606,11 @@ def interactive_mode():
                         log_error("Invalid input. Please enter a number.")
         
         elif choice == "2":
-            url = Prompt.ask("[bold cyan]Please enter the manga URL[/bold cyan]")
-            pdf_choice = Prompt.ask("[bold cyan]Convert to PDF? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
+            url = _ask("[bold cyan]Please enter the manga URL[/bold cyan]")
+            pdf_choice = _ask("[bold cyan]Convert to PDF? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
             delete_choice = "n"
             if pdf_choice.lower() == 'y':
-                delete_choice = Prompt.ask("[bold cyan]Delete images after PDF conversion? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
+                delete_choice = _ask("[bold cyan]Delete images after PDF conversion? (y/n)[/bold cyan]", choices=["y", "n"], default="n")
             _scrape_manga(url, create_pdf=(pdf_choice.lower() == 'y'), delete_images=(delete_choice.lower() == 'y'))
 
         elif choice == "3":
@@ -268,7 +649,7 @@ if __name__ == "__main__":
         console.print("1. CLI Interactive Mode")
         console.print("2. GUI Mode")
         
-        mode_choice = Prompt.ask("[bold cyan]Enter your choice (1-2)[/bold cyan]", choices=["1", "2"], default="1")
+        mode_choice = _ask("[bold cyan]Enter your choice (1-2)[/bold cyan]", choices=["1", "2"], default="1")
 
         if mode_choice == "1":
             interactive_mode()
@@ -0,0 +1,290 @@
+"""
+⚡ Asyncio download engine (single event loop, bounded by the shared request budget)
+"""
+
+import asyncio
+import hashlib
+import os
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from scraper.cache import get_http_cache
+from scraper.blob_store import get_blob_store
+from scraper.downloader import reuse_stored_image, chapter_paths, guess_image_extension, should_skip_chapter
+from scraper.fetcher import fetch_html
+from scraper.manifest import ChapterManifest, STATUS_FAILED
+from scraper.parser import parse_chapter_images
+from scraper.retry import RETRYABLE_STATUS_CODES, backoff_delay, get_retry_budget, retry_after_seconds
+from scraper.scheduler import get_scheduler
+from scraper.session import get_scraper
+from utils.config import REQUEST_TIMEOUT, RETRY_COUNT, RETRY_MAX_DELAY
+from utils.cbz_writer import OrderedCbzWriter
+from utils.logger import log_success, log_error, log_info, log_debug, log_progress
+from utils.metrics import get_metrics
+from utils.pdf_converter import convert_to_pdf
+from utils.transcoder import transcode_chapter, transcoding_enabled
+
+class ConcurrencyLimiter:
+    """
+    Applies the shared request budget on one event loop: the global in-flight cap,
+    per-host caps and the per-host token buckets of the scheduler.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.global_semaphore = asyncio.Semaphore(scheduler.max_in_flight)
+        self.host_semaphores = {}
+
+    def _host_semaphore(self, url, budget):
+        host = urlsplit(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(budget.concurrency)
+        return self.host_semaphores[host]
+
+    async def __call__(self, url, coro_fn):
+        budget = self.scheduler.host_budget(url)
+        delay = budget.bucket.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with self._host_semaphore(url, budget):
+            async with self.global_semaphore:
+                return await coro_fn()
+
+def _classify_async_error(error):
+    """aiohttp counterpart of `scraper.retry.classify_error`."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return "status" if error.status in RETRYABLE_STATUS_CODES else None
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return "connect"
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ServerDisconnectedError, aiohttp.ClientPayloadError)):
+        return "read"
+    return None
+
+async def _with_retries(limiter, url, coro_fn):
+    """Runs a request through the limiter, retrying transient failures like `scraper.retry.with_retries`."""
+    attempt = 0
+    while True:
+        try:
+            return await limiter(url, coro_fn)
+        except Exception as e:
+            kind = _classify_async_error(e)
+            if kind is None or attempt >= RETRY_COUNT or not get_retry_budget().consume(kind):
+                raise
+            get_metrics().count(f"retries_{kind}")
+            delay = backoff_delay(attempt, kind)
+            if kind == "status" and e.headers:
+                delay = max(delay, retry_after_seconds(e) or 0.0)
+            delay = min(delay, RETRY_MAX_DELAY)
+            log_info(f"Retrying {url} in {delay:.1f}s ({kind} failure: {e})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+def _write_file(file_path, data):
+    """Blocking file write, run off the event loop. Written via a `.part` file so crashes never leave truncated images."""
+    part_path = file_path + ".part"
+    with open(part_path, "wb") as f:
+        f.write(data)
+    os.replace(part_path, file_path)
+
+async def _fetch_chapter_html(session, limiter, url):
+    """Fetches a chapter page, falling back to the cloudscraper session if Cloudflare blocks aiohttp."""
+    cache = get_http_cache()
+    entry = await asyncio.to_thread(cache.get, url) if cache else None
+    if entry and entry.is_fresh():
+        cache.record("hit")
+        return entry.body
+
+    async def _get():
+        async with session.get(url) as response:
+            if response.status in (403, 503):
+                return None
+            response.raise_for_status()
+            return await response.text(), response.headers
+
+    metrics = get_metrics()
+    try:
+        log_info(f"Fetching HTML from: {url}")
+        with metrics.timer("fetch_html"):
+            result = await _with_retries(limiter, url, _get)
+    except Exception as e:
+        metrics.count("fetch_html_failed")
+        log_error(f"Failed to fetch HTML from {url}: {e}")
+        return None
+
+    if result is None:
+        # fetch_html does its own caching
+        return await asyncio.to_thread(fetch_html, url)
+
+    html, headers = result
+    metrics.add_bytes("fetch_html", len(html.encode("utf-8")))
+    if cache:
+        await asyncio.to_thread(cache.put, url, html, headers)
+        cache.record("miss")
+    return html
+
+async def _download_image(session, limiter, url, folder_path, image_index, referer_url, manifest):
+    """Downloads a single image and writes it through a worker thread."""
+    existing_path = manifest.completed_image(image_index, url)
+    if existing_path:
+        log_debug(f"Already downloaded: {os.path.basename(existing_path)}")
+        return existing_path
+
+    store = get_blob_store()
+    if store:
+        reused_path = await asyncio.to_thread(reuse_stored_image, store, url, folder_path, image_index, manifest)
+        if reused_path:
+            return reused_path
+
+    async def _get():
+        async with session.get(url, headers={"Referer": referer_url}) as response:
+            response.raise_for_status()
+            return response.headers.get("content-type"), await response.read()
+
+    metrics = get_metrics()
+    try:
+        with metrics.timer("download_image"):
+            content_type, data = await _with_retries(limiter, url, _get)
+        metrics.add_bytes("download_image", len(data))
+        ext = guess_image_extension(content_type, url)
+        image_name = f"{image_index:03d}{ext}"
+        file_path = os.path.join(folder_path, image_name)
+        if store:
+            blob = await asyncio.to_thread(store.ingest_bytes, data, ext, url)
+            await asyncio.to_thread(store.link, blob, file_path)
+            sha256 = blob.sha256
+        else:
+            await asyncio.to_thread(_write_file, file_path, data)
+            sha256 = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(manifest.record_image, image_index, url, image_name, len(data), sha256)
+        log_debug(f"Downloaded: {image_name}")
+        return file_path
+    except Exception as e:
+        metrics.count("download_image_failed")
+        await asyncio.to_thread(manifest.record_image, image_index, url, status=STATUS_FAILED)
+        log_error(f"Failed to download {url}: {e}")
+        return None
+
+async def _download_image_to_cbz(session, limiter, url, writer, image_index, referer_url):
+    """Downloads a single image and hands it to the CBZ writer, which stores it in page order."""
+    async def _get():
+        async with session.get(url, headers={"Referer": referer_url}) as response:
+            response.raise_for_status()
+            return response.headers.get("content-type"), await response.read()
+
+    metrics = get_metrics()
+    try:
+        with metrics.timer("download_image"):
+            content_type, data = await _with_retries(limiter, url, _get)
+        metrics.add_bytes("download_image", len(data))
+        image_name = f"{image_index:03d}{guess_image_extension(content_type, url)}"
+        await asyncio.to_thread(writer.deliver, image_index, image_name, data)
+        log_debug(f"Downloaded: {image_name}")
+        return True
+    except Exception as e:
+        metrics.count("download_image_failed")
+        await asyncio.to_thread(writer.deliver, image_index, None, None)
+        log_error(f"Failed to download {url}: {e}")
+        return False
+
+async def _with_progress(progress, coro):
+    """Awaits one image download and reports the chapter's progress (all on the loop thread, so no lock)."""
+    result = await coro
+    progress["done"] += 1
+    get_metrics().record_image(progress["key"], bool(result))
+    log_progress(progress["key"], progress["done"], progress["total"])
+    return result
+
+async def _process_chapter_cbz(session, limiter, chapter_title, image_urls, manga_title, chapter_url):
+    """Downloads a chapter's images straight into `<chapter>.cbz`."""
+    manga_folder, _ = chapter_paths(manga_title, chapter_title)
+    writer = await asyncio.to_thread(OrderedCbzWriter, os.path.join(manga_folder, f"{chapter_title}.cbz"))
+
+    progress = {"key": chapter_title, "done": 0, "total": len(image_urls)}
+    results = await asyncio.gather(*(
+        _with_progress(progress, _download_image_to_cbz(session, limiter, img_url, writer, i + 1, chapter_url))
+        for i, img_url in enumerate(image_urls)
+    ))
+    complete = all(results)
+    await asyncio.to_thread(writer.close, complete)
+    if complete:
+        log_success(f"Finished downloading chapter: {chapter_title}")
+    else:
+        log_error(f"Chapter {chapter_title} is incomplete ({sum(results)}/{len(image_urls)} images), archive discarded; rerun to retry")
+
+async def _process_chapter(session, limiter, chapter, manga_title, create_pdf, delete_images, converter, output_format):
+    """Fetches, parses and downloads a single chapter."""
+    chapter_title = chapter.title
+    chapter_url = chapter.url
+
+    if should_skip_chapter(manga_title, chapter_title, create_pdf, output_format):
+        log_info(f"Skipping chapter {chapter_title} (already downloaded)")
+        return
+
+    log_info(f"Processing chapter: {chapter_title}")
+
+    chapter_html = await _fetch_chapter_html(session, limiter, chapter_url)
+    if not chapter_html:
+        log_error(f"Skipping chapter {chapter_title} (could not fetch)")
+        return
+
+    image_urls = await asyncio.to_thread(parse_chapter_images, chapter_html)
+    if not image_urls:
+        log_error(f"Skipping chapter {chapter_title} (no images found)")
+        return
+
+    if output_format == "cbz":
+        await _process_chapter_cbz(session, limiter, chapter_title, image_urls, manga_title, chapter_url)
+        return
+
+    manga_folder, chapter_folder = chapter_paths(manga_title, chapter_title)
+    await asyncio.to_thread(os.makedirs, chapter_folder, exist_ok=True)
+    manifest = await asyncio.to_thread(ChapterManifest, chapter_folder, chapter_url)
+    progress = {"key": chapter_title, "done": 0, "total": len(image_urls)}
+
+    results = await asyncio.gather(*(
+        _with_progress(progress, _download_image(session, limiter, img_url, chapter_folder, i + 1, chapter_url, manifest))
+        for i, img_url in enumerate(image_urls)
+    ))
+    downloaded_image_paths = sorted(path for path in results if path)
+
+    complete = await asyncio.to_thread(manifest.finish, len(image_urls))
+    if complete:
+        log_success(f"Finished downloading chapter: {chapter_title}")
+    else:
+        log_error(f"Chapter {chapter_title} is incomplete ({len(downloaded_image_paths)}/{len(image_urls)} images), rerun to resume")
+
+    if create_pdf and downloaded_image_paths:
+        pdf_path = os.path.join(manga_folder, f"{chapter_title}.pdf")
+        # A partial chapter keeps its manifest (and folder) so a rerun resumes it
+        manifest_path = manifest.path if complete else None
+        if converter:
+            # Queued to the process pool; the event loop moves on to the next chapter immediately
+            converter.submit(convert_to_pdf, downloaded_image_paths, pdf_path, delete_images, manifest_path, label=pdf_path)
+        else:
+            with get_metrics().timer("convert_to_pdf"):
+                await asyncio.to_thread(convert_to_pdf, downloaded_image_paths, pdf_path, delete_images, manifest_path)
+    elif downloaded_image_paths and transcoding_enabled():
+        await asyncio.to_thread(transcode_chapter, chapter_title, manifest, downloaded_image_paths, converter)
+
+async def download_chapters_async(manga_title, chapters, create_pdf=False, delete_images=False, converter=None, output_format="images"):
+    """Downloads the given chapters concurrently on a single event loop."""
+    # Reuse the cloudscraper session's User-Agent and challenge cookies
+    scraper = await asyncio.to_thread(get_scraper)
+    headers = {"User-Agent": scraper.headers.get("User-Agent")}
+    cookies = {cookie.name: cookie.value for cookie in scraper.cookies}
+
+    scheduler = get_scheduler()
+    limiter = ConcurrencyLimiter(scheduler)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=scheduler.max_in_flight)
+
+    async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout, connector=connector) as session:
+        await asyncio.gather(*(
+            _process_chapter(session, limiter, chapter, manga_title, create_pdf, delete_images, converter, output_format)
+            for chapter in chapters
+        ))
+
+def run_async_download(manga_title, chapters, create_pdf=False, delete_images=False, converter=None, output_format="images"):
+    """Runs the asyncio engine to completion from synchronous code."""
+    asyncio.run(download_chapters_async(manga_title, chapters, create_pdf, delete_images, converter, output_format))
@@ -0,0 +1,160 @@
+"""
+🧬 Content-addressed image store (deduplicates pages reused across chapters and series)
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+
+from utils import config
+
+INDEX_NAME = "index.sqlite3"
+
+class StoredBlob:
+    """An image already in the store."""
+
+    __slots__ = ("sha256", "ext", "size", "path")
+
+    def __init__(self, sha256, ext, size, path):
+        self.sha256 = sha256
+        self.ext = ext
+        self.size = size
+        self.path = path
+
+class BlobStore:
+    """
+    Keeps every downloaded image once, as `<root>/<ab>/<sha256><ext>`, and hardlinks it into
+    chapter folders. A SQLite index maps image URLs to content hashes so an image URL that
+    was stored before (by any chapter or series) is never transferred again.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.reused = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        os.makedirs(root, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, INDEX_NAME), check_same_thread=False)
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, ext TEXT NOT NULL, size INTEGER NOT NULL)"
+            )
+            self.db.commit()
+
+    def blob_path(self, sha256, ext):
+        return os.path.join(self.root, sha256[:2], f"{sha256}{ext}")
+
+    def lookup(self, url):
+        """Returns the stored blob previously downloaded from `url`, or None."""
+        with self.lock:
+            row = self.db.execute("SELECT sha256, ext, size FROM urls WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        sha256, ext, size = row
+        path = self.blob_path(sha256, ext)
+        if not os.path.exists(path):
+            # The blob was removed by hand; forget the URL so it is downloaded again
+            with self.lock:
+                self.db.execute("DELETE FROM urls WHERE url = ?", (url,))
+                self.db.commit()
+            return None
+        return StoredBlob(sha256, ext, size, path)
+
+    def record_reuse(self, blob):
+        """Counts a transfer skipped because the URL was already stored."""
+        with self.lock:
+            self.reused += 1
+            self.bytes_saved += blob.size
+
+    def ingest_file(self, src_path, sha256, ext, url):
+        """
+        Moves a fully downloaded file into the store and indexes `url`. If identical content
+        is already stored, the new copy is dropped. Returns the StoredBlob.
+        """
+        path = self.blob_path(sha256, ext)
+        size = os.path.getsize(src_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(src_path)
+            with self.lock:
+                self.deduplicated += 1
+                self.bytes_saved += size
+        else:
+            try:
+                os.replace(src_path, path)
+            except OSError:
+                # Store on another filesystem: copy, then swap in atomically
+                tmp_path = f"{path}.{threading.get_ident()}.part"
+                shutil.copyfile(src_path, tmp_path)
+                os.replace(tmp_path, path)
+                os.remove(src_path)
+        self._index(url, sha256, ext, size)
+        return StoredBlob(sha256, ext, size, path)
+
+    def ingest_bytes(self, data, ext, url):
+        """Stores an in-memory image (see `ingest_file`). Returns the StoredBlob."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(sha256, ext)
+        if os.path.exists(path):
+            with self.lock:
+                self.deduplicated += 1
+                self.bytes_saved += len(data)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._index(url, sha256, ext, len(data))
+        return StoredBlob(sha256, ext, len(data), path)
+
+    def _index(self, url, sha256, ext, size):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO urls (url, sha256, ext, size) VALUES (?, ?, ?, ?)", (url, sha256, ext, size))
+            self.db.commit()
+
+    @staticmethod
+    def link(blob, dest_path):
+        """
+        Places a stored blob at `dest_path` as a hardlink, falling back to a copy on
+        filesystems without hardlink support. Replaces any existing file atomically.
+        """
+        if os.path.exists(dest_path) and os.path.samefile(blob.path, dest_path):
+            return dest_path
+        tmp_path = f"{dest_path}.{threading.get_ident()}.link"
+        try:
+            os.link(blob.path, tmp_path)
+        except OSError:
+            shutil.copyfile(blob.path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return dest_path
+
+    def read(self, blob):
+        with open(blob.path, "rb") as f:
+            return f.read()
+
+    def summary(self):
+        with self.lock:
+            return (
+                f"Image store: {self.reused} images reused, {self.deduplicated} duplicates dropped, "
+                f"{self.bytes_saved / 1024 / 1024:.1f} MiB saved"
+            )
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_blob_store():
+    """Returns the shared image store, or None when it is disabled (or pages are being transcoded)."""
+    global _store
+    # Transcoding deletes the downloaded originals, which a stored copy would keep on disk
+    if not config.BLOB_STORE_ENABLED or config.TRANSCODE_FORMAT:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore(config.BLOB_STORE_DIR or os.path.join(config.DOWNLOAD_DIR, ".blobs"))
+    return _store
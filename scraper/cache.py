@@ -0,0 +1,197 @@
+"""
+🗄️ On-disk HTTP response cache for series, search and chapter pages
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from utils import config
+from utils.metrics import get_metrics
+
+# Chapter reader pages live one level below the series page, e.g. /serie/<slug>/chapter-12/
+CHAPTER_URL_RE = re.compile(r'/(?:serie|webtoon|manga)/[^/]+/[^/?#]+/?(?:[?#].*)?$')
+
+def ttl_for(url):
+    """Chapter pages practically never change; series and search pages do."""
+    if CHAPTER_URL_RE.search(url):
+        return config.CACHE_TTL_CHAPTER
+    return config.CACHE_TTL_SERIES
+
+class CacheEntry:
+    """A cached response body with its validators."""
+
+    __slots__ = ("url", "body", "etag", "last_modified", "stored_at", "ttl")
+
+    def __init__(self, url, body, etag, last_modified, stored_at, ttl):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.ttl = ttl
+
+    def is_fresh(self):
+        return time.time() - self.stored_at < self.ttl
+
+    def validators(self):
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class HttpCache:
+    """
+    Content cache keyed by URL. Each entry is a body file plus a small JSON metadata file;
+    the least recently used entries are evicted once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        # key -> [last_access, size]
+        self.index = {}
+        self.total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f"{key}.body"), os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _load_index(self):
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, name), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self.index[name[:-5]] = [meta.get("last_access", 0), meta.get("size", 0)]
+            self.total_bytes += meta.get("size", 0)
+
+    def get(self, url):
+        """Returns the cached entry for `url` (fresh or stale), or None."""
+        key = self._key(url)
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "r", encoding="utf-8") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        with self.lock:
+            if key in self.index:
+                self.index[key][0] = time.time()
+        return CacheEntry(url, body, meta.get("etag"), meta.get("last_modified"), meta["stored_at"], meta["ttl"])
+
+    def put(self, url, body, headers=None, ttl=None):
+        """Stores a response body with its ETag/Last-Modified validators."""
+        headers = headers or {}
+        key = self._key(url)
+        body_path, meta_path = self._paths(key)
+        data = body.encode("utf-8")
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "ttl": ttl_for(url) if ttl is None else ttl,
+            "size": len(data),
+            "last_access": time.time(),
+        }
+        self._write_atomic(body_path, data)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+        with self.lock:
+            previous = self.index.get(key)
+            if previous:
+                self.total_bytes -= previous[1]
+            self.index[key] = [meta["last_access"], len(data)]
+            self.total_bytes += len(data)
+            self._evict()
+
+    def refresh(self, entry):
+        """Marks a stale entry fresh again after a 304 Not Modified."""
+        key = self._key(entry.url)
+        _, meta_path = self._paths(key)
+        entry.stored_at = time.time()
+        meta = {
+            "url": entry.url,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "stored_at": entry.stored_at,
+            "ttl": entry.ttl,
+            "size": self.index.get(key, [0, 0])[1],
+            "last_access": entry.stored_at,
+        }
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _evict(self):
+        # Called with the lock held
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self.index.items(), key=lambda item: item[1][0]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            del self.index[key]
+            self.total_bytes -= size
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def record(self, outcome):
+        """Counts a lookup outcome: 'hit', 'miss' or 'revalidated'."""
+        get_metrics().count(f"cache_{outcome}")
+        with self.lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def summary(self):
+        with self.lock:
+            return (
+                f"HTTP cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} misses, "
+                f"{self.total_bytes / 1024 / 1024:.1f} MiB in {len(self.index)} entries"
+            )
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_http_cache():
+    """Returns the shared cache, or None when caching is disabled."""
+    global _cache
+    if not config.HTTP_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache(config.CACHE_DIR, config.CACHE_MAX_BYTES)
+    return _cache
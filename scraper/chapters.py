@@ -0,0 +1,126 @@
+"""
+🔢 Chapter metadata extraction (numbering, seasons, side stories, extras)
+"""
+
+import math
+import re
+
+# Side story and extra markers only count when they come before the chapter number, so "Special
+# Episode 3" is extra 3 while "Chapter 45 - Special" and "Chapter 7: Side Story Arc" stay main chapters
+SIDE_STORY_RE = re.compile(r'\bside\s*story\b\s*(\d+)?', re.IGNORECASE)
+EXTRA_RE = re.compile(r'\b(?:extra|special|bonus|epilogue)\b\D*(\d+)?', re.IGNORECASE)
+CHAPTER_RE = re.compile(r'(?:\bchapter|\bch\.?|\bepisode|\bep\.?)\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+PROLOGUE_RE = re.compile(r'\bprologue\b', re.IGNORECASE)
+SEASON_RE = re.compile(r'\b(?:season\s*|s)(\d+)\b', re.IGNORECASE)
+
+KIND_MAIN = "main"
+KIND_PROLOGUE = "prologue"
+KIND_SIDE_STORY = "side_story"
+KIND_EXTRA = "extra"
+KIND_UNNUMBERED = "unnumbered"
+
+class Chapter:
+    """A single chapter entry of a series."""
+
+    __slots__ = ("title", "url", "number", "season", "kind", "original_number", "position")
+
+    def __init__(self, title, url, number, season, kind, original_number, position):
+        self.title = title
+        self.url = url
+        self.number = number
+        self.season = season
+        self.kind = kind
+        self.original_number = original_number
+        self.position = position
+
+    @property
+    def is_side_story(self):
+        return self.kind in (KIND_SIDE_STORY, KIND_EXTRA)
+
+    @property
+    def key(self):
+        """Selection key: later seasons restart their numbering, so the season is part of it."""
+        return (self.season, self.number)
+
+    @property
+    def label(self):
+        """The chapter's selection term, e.g. "12" or "s2:1" for chapter 1 of season 2."""
+        return f"{self.number:g}" if self.season == 1 else f"s{self.season}:{self.number:g}"
+
+    def __repr__(self):
+        return f"Chapter({self.number!r}, {self.title!r})"
+
+def classify_chapter(title, url, position=0):
+    """Builds a Chapter from a chapter-list title such as "Chapter 12.5", "Ch. 3", "Season 2 Episode 4" or "Side Story 1"."""
+    match = CHAPTER_RE.search(title)
+    number_start = match.start() if match else len(title)
+
+    marker = SIDE_STORY_RE.search(title)
+    if marker and marker.start() < number_start:
+        return Chapter(title, url, 0.0, 1, KIND_SIDE_STORY, int(marker.group(1) or 0), position)
+
+    marker = EXTRA_RE.search(title)
+    if marker and marker.start() < number_start:
+        return Chapter(title, url, 0.0, 1, KIND_EXTRA, int(marker.group(1) or 0), position)
+
+    if match:
+        season_match = SEASON_RE.search(title, 0, match.start())
+        season = int(season_match.group(1)) if season_match else 1
+        number = float(match.group(1))
+        return Chapter(title, url, number, season, KIND_MAIN, number, position)
+
+    if PROLOGUE_RE.search(title):
+        return Chapter(title, url, 0.0, 1, KIND_PROLOGUE, 0.0, position)
+
+    # Assign a negative value for truly unnumbered chapters
+    return Chapter(title, url, -1.0, 1, KIND_UNNUMBERED, -1.0, position)
+
+def order_chapters(chapters):
+    """
+    Sorts main chapters by (season, number) and numbers side stories and extras after
+    the last main chapter, in (kind, original number, list position) order.
+    """
+    main_chapters = []
+    extras = []
+    for chapter in chapters:
+        (extras if chapter.is_side_story else main_chapters).append(chapter)
+
+    main_chapters.sort(key=lambda c: (c.season, c.number))
+    # Side stories come before other extras; Toonily lists newest first, so fall back to reversed position
+    extras.sort(key=lambda c: (c.kind != KIND_SIDE_STORY, c.original_number, -c.position))
+
+    max_main_number = max((c.number for c in main_chapters), default=0.0)
+    next_number = math.ceil(max_main_number)
+    if next_number <= max_main_number:
+        next_number += 1.0
+
+    for i, chapter in enumerate(extras):
+        chapter.number = float(next_number + i)
+
+    return main_chapters + extras
+
+def extract_chapters(entries):
+    """Classifies (title, url) pairs in a single pass and returns them in reading order."""
+    return order_chapters([classify_chapter(title, url, i) for i, (title, url) in enumerate(entries)])
+
+
+if __name__ == "__main__":
+    # Classification of titles that have been misread before: (title, kind, season, number)
+    cases = [
+        ("Chapter 12.5", KIND_MAIN, 1, 12.5),
+        ("Season 2 Episode 4", KIND_MAIN, 2, 4.0),
+        ("Chapter 45 - Special", KIND_MAIN, 1, 45.0),
+        ("Chapter 50 Bonus", KIND_MAIN, 1, 50.0),
+        ("Chapter 2: Epilogue of a Hero", KIND_MAIN, 1, 2.0),
+        ("Chapter 3 - Extra Large", KIND_MAIN, 1, 3.0),
+        ("Chapter 7: Side Story Arc", KIND_MAIN, 1, 7.0),
+        ("Side Story 1", KIND_SIDE_STORY, 1, 1),
+        ("Special Episode 3", KIND_EXTRA, 1, 3),
+        ("Epilogue", KIND_EXTRA, 1, 0),
+        ("Prologue", KIND_PROLOGUE, 1, 0.0),
+    ]
+    for title, kind, season, number in cases:
+        chapter = classify_chapter(title, "")
+        actual = (chapter.kind, chapter.season, chapter.number if kind == KIND_MAIN else chapter.original_number)
+        assert actual == (kind, season, number), f"{title!r}: {actual}"
+    print(f"{len(cases)} titles classified as expected")
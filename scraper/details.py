@@ -0,0 +1,57 @@
+"""
+🧾 In-memory memoization of parsed series pages
+"""
+
+import threading
+import time
+
+from scraper.fetcher import fetch_html
+from scraper.parser import parse_manga_details
+from utils import config
+
+class MemoCache:
+    """Thread-safe dict whose entries expire `ttl` seconds after they were stored."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+
+_details_memo = MemoCache(config.DETAILS_MEMO_TTL)
+
+def remember_manga_details(url, manga_details):
+    """Stores already parsed details so later lookups for `url` skip fetching and parsing."""
+    _details_memo.put(url, manga_details)
+
+def get_manga_details(url, refresh=False):
+    """
+    Returns the parsed details of a series page, reusing a recent result for the same URL.
+    Returns None if the page could not be fetched or parsed.
+    """
+    if not refresh:
+        manga_details = _details_memo.get(url)
+        if manga_details is not None:
+            return manga_details
+
+    html = fetch_html(url, revalidate=refresh)
+    if not html:
+        return None
+    manga_details = parse_manga_details(html)
+    if manga_details:
+        remember_manga_details(url, manga_details)
+    return manga_details
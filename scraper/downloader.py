@@ -3,93 +3,294 @@
 """
 
 import os
+import hashlib
 import mimetypes
-import cloudscraper
-from concurrent.futures import ThreadPoolExecutor
+import sqlite3
 
-from utils.config import DOWNLOAD_DIR, DOWNLOAD_THREADS
-from utils.logger import log_success, log_error, log_info
+import requests
+
+from scraper.blob_store import get_blob_store
+from scraper.manifest import MANIFEST_NAME, STATUS_FAILED, is_chapter_complete
+from scraper.retry import with_retries
+from scraper.scheduler import get_scheduler
+from scraper.session import get_scraper
+from scraper.streaming import check_length, iter_body, stream_to_file
+from utils.config import DOWNLOAD_DIR, REQUEST_TIMEOUT
+from utils.logger import log_success, log_error, log_debug
+from utils.metrics import get_metrics
 from utils.pdf_converter import convert_to_pdf
+from utils.transcoder import transcode_chapter, transcoding_enabled
+
+def guess_image_extension(content_type, url):
+    """Determines the file extension of an image from its Content-Type header, falling back to the URL."""
+    ext = mimetypes.guess_extension(content_type) if content_type else ".jpg"
+
+    if ext == ".jpe":
+        ext = ".jpg"
+
+    # Fallback if the content type is not an image
+    if not ext or not content_type or "image" not in content_type:
+        # Try to get from URL
+        url_ext = os.path.splitext(url.split("?")[0])[1]
+        if url_ext in [".jpg", ".jpeg", ".png", ".webp", ".gif"]:
+            ext = url_ext
+        else:
+            ext = ".jpg"  # Default to .jpg if all else fails
+
+    return ext
+
+def chapter_paths(manga_title, chapter_title):
+    """Returns the manga folder and chapter folder used for a chapter."""
+    manga_folder = os.path.join(DOWNLOAD_DIR, manga_title)
+    return manga_folder, os.path.join(manga_folder, chapter_title)
+
+def should_skip_chapter(manga_title, chapter_title, create_pdf=False, output_format="images"):
+    """True if a previous run already completed this chapter (and its PDF or CBZ, when requested)."""
+    manga_folder, chapter_folder = chapter_paths(manga_title, chapter_title)
+    if output_format == "cbz":
+        return os.path.exists(os.path.join(manga_folder, f"{chapter_title}.cbz"))
+    pdf_exists = create_pdf and os.path.exists(os.path.join(manga_folder, f"{chapter_title}.pdf"))
+    # --delete removes a complete chapter's folder, manifest included, once its PDF is written
+    if pdf_exists and not os.path.exists(os.path.join(chapter_folder, MANIFEST_NAME)):
+        return True
+    if not is_chapter_complete(chapter_folder):
+        return False
+    return not create_pdf or pdf_exists
 
-def download_image(url, folder_path, image_index, referer_url, user_agent):
-    """Downloads a single image and saves it using cloudscraper with custom headers."""
-    scraper = cloudscraper.create_scraper()
-    custom_headers = {
-        "Referer": referer_url,
-        "User-Agent": user_agent
-    }
+def reuse_stored_image(store, url, folder_path, image_index, manifest=None):
+    """Links an image previously stored from `url` into the chapter folder. Returns its path, or None."""
     try:
-        img_res = scraper.get(url, headers=custom_headers, stream=True)
-        img_res.raise_for_status()
-
-        # Determine file extension from Content-Type header
-        content_type = img_res.headers.get("content-type")
-        ext = mimetypes.guess_extension(content_type) if content_type else ".jpg"
-
-        if ext == ".jpe":
-            ext = ".jpg"
-
-        # Fallback if the content type is not an image
-        if not ext or "image" not in content_type:
-            # Try to get from URL
-            url_ext = os.path.splitext(url.split("?")[0])[1]
-            if url_ext in [".jpg", ".jpeg", ".png", ".webp", ".gif"]:
-                ext = url_ext
-            else:
-                ext = ".jpg"  # Default to .jpg if all else fails
-
-        image_name = f"{image_index:03d}{ext}"
+        blob = store.lookup(url)
+        if not blob:
+            return None
+        image_name = f"{image_index:03d}{blob.ext}"
         os.makedirs(folder_path, exist_ok=True)
+        file_path = store.link(blob, os.path.join(folder_path, image_name))
+    except (OSError, sqlite3.Error) as e:
+        log_error(f"Could not reuse stored image for {url}: {e}")
+        return None
+    store.record_reuse(blob)
+    get_metrics().count("image_store_reused")
+    if manifest:
+        manifest.record_image(image_index, url, image_name, blob.size, blob.sha256)
+    log_debug(f"Reused stored image: {image_name}")
+    return file_path
 
-        file_path = os.path.join(folder_path, image_name)
-        with open(file_path, "wb") as f:
-            for chunk in img_res.iter_content(8192):
-                f.write(chunk)
+def download_image(url, folder_path, image_index, referer_url, user_agent, manifest=None):
+    """
+    Downloads a single image and saves it using the shared cloudscraper session with custom headers.
+    Data is streamed into `NNN.part` and renamed once complete; a leftover `.part` file from an
+    interrupted run is resumed with an HTTP Range request. With the image store enabled, the
+    finished file is moved into the store and hardlinked back, and URLs that were stored before
+    are linked without any transfer.
+    """
+    if manifest:
+        existing_path = manifest.completed_image(image_index, url)
+        if existing_path:
+            log_debug(f"Already downloaded: {os.path.basename(existing_path)}")
+            return existing_path
+
+    store = get_blob_store()
+    if store:
+        reused_path = reuse_stored_image(store, url, folder_path, image_index, manifest)
+        if reused_path:
+            return reused_path
+
+    scraper = get_scraper()
+    part_path = os.path.join(folder_path, f"{image_index:03d}.part")
+
+    def _download():
+        custom_headers = {
+            "Referer": referer_url,
+            "User-Agent": user_agent
+        }
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+        # The slot is held until the body has been streamed to disk
+        with get_scheduler().slot(url):
+            if offset:
+                img_res = scraper.get(url, headers={**custom_headers, "Range": f"bytes={offset}-"},
+                                      stream=True, timeout=REQUEST_TIMEOUT)
+                if img_res.status_code == 416:
+                    # The partial file does not match the remote image, start over
+                    img_res.close()
+                    os.remove(part_path)
+                    offset = 0
+            if not offset:
+                img_res = scraper.get(url, headers=custom_headers, stream=True, timeout=REQUEST_TIMEOUT)
+            img_res.raise_for_status()
+
+            ext = guess_image_extension(img_res.headers.get("content-type"), url)
+            image_name = f"{image_index:03d}{ext}"
+            os.makedirs(folder_path, exist_ok=True)
 
-        log_success(f"Downloaded: {image_name}")
+            # Only append when the server honoured the range, otherwise rewrite from scratch
+            resumed = offset and img_res.status_code == 206
+            if resumed and not img_res.headers.get("content-range", "").startswith(f"bytes {offset}-"):
+                img_res.close()
+                os.remove(part_path)
+                raise requests.exceptions.ConnectionError(f"Unexpected Content-Range for {url}")
+            digest = hashlib.sha256()
+            if resumed:
+                with open(part_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(chunk)
+
+            with open(part_path, "ab" if resumed else "wb") as f:
+                metrics.add_bytes("download_image", stream_to_file(img_res, f, digest))
+
+        return image_name, digest.hexdigest()
+
+    metrics = get_metrics()
+    try:
+        with metrics.timer("download_image"):
+            image_name, sha256 = with_retries(_download, url)
+        file_path = os.path.join(folder_path, image_name)
+        if store:
+            blob = store.ingest_file(part_path, sha256, os.path.splitext(image_name)[1], url)
+            store.link(blob, file_path)
+        else:
+            os.replace(part_path, file_path)
+        if manifest:
+            manifest.record_image(image_index, url, image_name, os.path.getsize(file_path), sha256)
+        log_debug(f"Downloaded: {image_name}")
         return file_path
     except Exception as e:
+        metrics.count("download_image_failed")
+        if manifest:
+            manifest.record_image(image_index, url, status=STATUS_FAILED)
         log_error(f"Failed to download {url}: {e}")
         return None
 
-def download_chapter(chapter_title, image_urls, manga_title, chapter_url, create_pdf=False, delete_images=False):
-    """Downloads all images for a given chapter and optionally converts them to PDF."""
-    manga_folder = os.path.join(DOWNLOAD_DIR, manga_title)
-    chapter_folder = os.path.join(manga_folder, chapter_title)
+def download_image_to_cbz(url, writer, image_index, referer_url, user_agent):
+    """
+    Streams a single image from the network into its CBZ entry without touching disk.
+    If a transfer breaks after bytes were already written, the retry continues from
+    that offset (with a Range request, or by skipping bytes when ranges are unsupported).
+    Images already in the image store are read from it instead of the network.
+    """
+    store = get_blob_store()
+    blob = None
+    if store:
+        try:
+            blob = store.lookup(url)
+            if blob:
+                data = store.read(blob)
+        except (OSError, sqlite3.Error) as e:
+            log_error(f"Could not reuse stored image for {url}: {e}")
+            blob = None
+    if blob:
+        image_name = f"{image_index:03d}{blob.ext}"
+        writer.deliver(image_index, image_name, data)
+        store.record_reuse(blob)
+        get_metrics().count("image_store_reused")
+        log_debug(f"Reused stored image: {image_name}")
+        return True
+
+    scraper = get_scraper()
+    state = {"entry": None, "buffer": [], "received": 0, "name": None}
 
-    log_info(f"Downloading chapter: {chapter_title}")
+    def _download():
+        custom_headers = {
+            "Referer": referer_url,
+            "User-Agent": user_agent
+        }
+        offset = state["received"]
+        if offset:
+            custom_headers["Range"] = f"bytes={offset}-"
 
-    # Get a user agent from a new scraper instance for consistency
-    temp_scraper = cloudscraper.create_scraper()
-    user_agent = temp_scraper.headers.get("User-Agent")
+        with get_scheduler().slot(url):
+            img_res = scraper.get(url, headers=custom_headers, stream=True, timeout=REQUEST_TIMEOUT)
+            img_res.raise_for_status()
+            if state["name"] is None:
+                ext = guess_image_extension(img_res.headers.get("content-type"), url)
+                state["name"] = f"{image_index:03d}{ext}"
 
-    downloaded_image_paths = []
-    with ThreadPoolExecutor(max_workers=DOWNLOAD_THREADS) as executor:
-        futures = []
-        for i, img_url in enumerate(image_urls):
-            futures.append(executor.submit(download_image, img_url, chapter_folder, i + 1, chapter_url, user_agent))
+            # Bytes the server re-sends because it ignored the Range header
+            skip = offset if img_res.status_code != 206 else 0
+            body_received = 0
+            for chunk in iter_body(img_res):
+                body_received += len(chunk)
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk = chunk[skip:]
+                    skip = 0
 
-        for future in futures:
-            result = future.result() # Wait for all downloads to complete
-            if result:
-                downloaded_image_paths.append(result)
+                if state["entry"] is None:
+                    state["entry"] = writer.begin(image_index, state["name"])
+                    if state["entry"] is not None:
+                        for buffered in state["buffer"]:
+                            state["entry"].write(buffered)
+                        state["buffer"] = []
 
-    log_success(f"Finished downloading chapter: {chapter_title}")
+                if state["entry"] is not None:
+                    state["entry"].write(chunk)
+                else:
+                    # The chunk is a view over a reused buffer, so keep a copy
+                    state["buffer"].append(bytes(chunk))
+                state["received"] += len(chunk)
+            check_length(img_res, body_received)
+            metrics.add_bytes("download_image", body_received)
+
+    metrics = get_metrics()
+    try:
+        with metrics.timer("download_image"):
+            with_retries(_download, url)
+        if state["entry"] is not None:
+            writer.end(state["entry"])
+        else:
+            writer.deliver(image_index, state["name"], b"".join(state["buffer"]))
+        log_debug(f"Downloaded: {state['name']}")
+        return True
+    except Exception as e:
+        metrics.count("download_image_failed")
+        if state["entry"] is not None:
+            # Keep the archive consistent; the chapter is discarded as incomplete
+            writer.end(state["entry"])
+        else:
+            writer.deliver(image_index, None, None)
+        log_error(f"Failed to download {url}: {e}")
+        return False
+
+def finish_cbz_chapter(chapter_title, writer, succeeded, image_count):
+    """Moves a complete CBZ archive into place, or discards it when pages are missing."""
+    complete = succeeded == image_count
+    writer.close(keep=complete)
+    if complete:
+        log_success(f"Finished downloading chapter: {chapter_title} -> {writer.path}")
+    else:
+        log_error(f"Chapter {chapter_title} is incomplete ({succeeded}/{image_count} images), archive discarded; rerun to retry")
+    return writer.path if complete else None
+
+def finish_chapter(chapter_title, manga_folder, manifest, image_count, downloaded_image_paths, create_pdf=False, delete_images=False, converter=None):
+    """Records the chapter's final status in its manifest and builds (or queues) its PDF or transcoding."""
+    complete = manifest.finish(image_count)
+    if complete:
+        log_success(f"Finished downloading chapter: {chapter_title}")
+    else:
+        log_error(f"Chapter {chapter_title} is incomplete ({len(downloaded_image_paths)}/{image_count} images), rerun to resume")
 
     if create_pdf and downloaded_image_paths:
         pdf_path = os.path.join(manga_folder, f"{chapter_title}.pdf")
         # Sort images by name before converting to PDF
         downloaded_image_paths.sort()
-        convert_to_pdf(downloaded_image_paths, pdf_path, delete_images)
+        # A partial chapter keeps its manifest (and folder) so a rerun resumes it
+        manifest_path = manifest.path if complete else None
+        if converter:
+            converter.submit(convert_to_pdf, downloaded_image_paths, pdf_path, delete_images, manifest_path, label=pdf_path)
+        else:
+            with get_metrics().timer("convert_to_pdf"):
+                convert_to_pdf(downloaded_image_paths, pdf_path, delete_images, manifest_path)
+    elif downloaded_image_paths and transcoding_enabled():
+        transcode_chapter(chapter_title, manifest, downloaded_image_paths, converter)
 
 
 if __name__ == "__main__":
-    # Example usage for testing
-    # This requires a list of image URLs from the parser
-    # For demonstration, we'll use placeholder URLs
-    test_image_urls = [
-        "https://via.placeholder.com/800x1200.png?text=Image+1",
-        "https://via.placeholder.com/800x1200.png?text=Image+2",
-        "https://via.placeholder.com/800x1200.png?text=Image+3"
-    ]
-    download_chapter("Chapter 1", test_image_urls, "Test Manga", "https://example.com", create_pdf=True, delete_images=True)
+    # Example usage for testing: downloads one chapter through the download pipeline
+    from scraper.chapters import classify_chapter
+    from scraper.pipeline import DownloadPipeline
+
+    test_chapter = classify_chapter("Chapter 1", "https://toonily.com/serie/solo-leveling/chapter-1/")
+    DownloadPipeline("Test Manga", create_pdf=True, delete_images=True).run([test_chapter])
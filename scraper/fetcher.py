@@ -2,25 +2,57 @@
 🌐 Handles HTTP requests (headers, retries, proxies)
 """
 
-import cloudscraper
-
-from utils.config import USER_AGENT, REQUEST_TIMEOUT
+from scraper.cache import get_http_cache
+from scraper.retry import with_retries
+from scraper.scheduler import get_scheduler
+from scraper.session import get_scraper
+from utils.config import REQUEST_TIMEOUT
 from utils.logger import log_error, log_info
+from utils.metrics import get_metrics
+
+def fetch_html(url, headers=None, revalidate=False):
+    """
+    Fetches HTML content from a given URL using the shared cloudscraper session.
+    Responses are served from the on-disk cache while fresh; stale entries are revalidated
+    with ETag/Last-Modified. `revalidate=True` always checks with the server.
+    """
+    cache = get_http_cache()
+    entry = cache.get(url) if cache else None
+    if entry and entry.is_fresh() and not revalidate:
+        cache.record("hit")
+        return entry.body
 
-def fetch_html(url, headers=None):
-    """Fetches HTML content from a given URL using cloudscraper."""
-    scraper = cloudscraper.create_scraper(browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False})
+    scraper = get_scraper()
     try:
         log_info(f"Fetching HTML from: {url}")
         # Merge default scraper headers with custom headers
         effective_headers = scraper.headers.copy()
         if headers:
             effective_headers.update(headers)
+        if entry:
+            effective_headers.update(entry.validators())
+
+        def _get():
+            with get_scheduler().slot(url):
+                response = scraper.get(url, headers=effective_headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()  # Raise an exception for bad status codes
+            return response
+
+        metrics = get_metrics()
+        with metrics.timer("fetch_html"):
+            response = with_retries(_get, url)
+        metrics.add_bytes("fetch_html", len(response.content))
+        if entry and response.status_code == 304:
+            cache.refresh(entry)
+            cache.record("revalidated")
+            return entry.body
 
-        response = scraper.get(url, headers=effective_headers, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()  # Raise an exception for bad status codes
+        if cache:
+            cache.put(url, response.text, response.headers)
+            cache.record("miss")
         return response.text
     except Exception as e:
+        get_metrics().count("fetch_html_failed")
         log_error(f"Failed to fetch HTML from {url}: {e}")
         return None
 
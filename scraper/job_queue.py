@@ -0,0 +1,344 @@
+"""
+🗃️ Durable job queue for batch downloads (SQLite)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import config
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_INCOMPLETE = "incomplete"
+JOB_FAILED = "failed"
+
+# Chapter statuses are the DownloadPipeline's: complete, incomplete, skipped (already on disk) or failed
+CHAPTER_QUEUED = "queued"
+CHAPTER_LEASED = "leased"
+CHAPTER_FINISHED = ("complete", "skipped")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    selection TEXT NOT NULL DEFAULT 'all',
+    output_format TEXT NOT NULL DEFAULT 'images',
+    create_pdf INTEGER NOT NULL DEFAULT 0,
+    delete_images INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    title TEXT,
+    error TEXT,
+    added_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    lease_expires REAL,
+    UNIQUE (url, selection, output_format, create_pdf)
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    number REAL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    updated_at REAL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_id, url)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+CREATE INDEX IF NOT EXISTS chapters_status ON chapters(status);
+"""
+
+# Columns added after the first release of the queue, created on open for older databases
+LEASE_COLUMNS = {
+    "jobs": ("worker TEXT", "lease_expires REAL"),
+    "chapters": ("worker TEXT", "lease_expires REAL", "attempts INTEGER NOT NULL DEFAULT 0"),
+}
+
+_FINISHED_SQL = f"({', '.join(repr(status) for status in CHAPTER_FINISHED)})"
+
+def parse_job_file(path):
+    """
+    Reads a job file: one series per line, `<series url> [chapter selection]`, with '#'
+    comments. Lines without a selection download every chapter. Returns (url, selection) pairs.
+    """
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            url, _, selection = line.partition(" ")
+            jobs.append((url, selection.strip() or "all"))
+    return jobs
+
+class JobQueue:
+    """
+    Series jobs and their chapters, persisted after every state change so a crashed or
+    interrupted batch resumes where it stopped. Per-image progress stays in each chapter's
+    manifest; the queue records which chapters of each job are finished.
+
+    Worker processes (on one host or several sharing the filesystem) claim jobs and chapters
+    under a lease that they renew with heartbeats; a lease that expires because its worker
+    died is claimed by the next worker. Claims run in IMMEDIATE transactions, so the
+    database must live on a filesystem with reliable POSIX (fcntl) locks. The default
+    rollback journal (JOB_QUEUE_JOURNAL_MODE = "DELETE") works across hosts; WAL keeps
+    its index in shared memory and is only safe when every connection is on one host.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.JOB_QUEUE_PATH or os.path.join(config.DOWNLOAD_DIR, "jobs.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        # Other worker processes hold the write lock only briefly, so wait for it instead of failing
+        self.db = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock:
+            self.db.execute(f"PRAGMA journal_mode={config.JOB_QUEUE_JOURNAL_MODE}")
+            self.db.executescript(SCHEMA)
+            for table, columns in LEASE_COLUMNS.items():
+                existing = {row["name"] for row in self.db.execute(f"PRAGMA table_info({table})")}
+                for column in columns:
+                    if column.split()[0] not in existing:
+                        self.db.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+            self.db.commit()
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            cursor = self.db.execute(sql, params)
+            self.db.commit()
+            return cursor
+
+    @contextmanager
+    def exclusive(self):
+        """Holds the queue's write lock for a block, serializing it across worker processes and hosts."""
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            finally:
+                self.db.commit()
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def add_job(self, url, selection="all", create_pdf=False, delete_images=False, output_format="images"):
+        """
+        Queues a series. Returns the new job id, the id of a failed copy of the job that is
+        queued again, or None if the same job is already in the queue.
+        """
+        params = (url, selection, output_format, int(create_pdf))
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO jobs (url, selection, output_format, create_pdf, delete_images, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                params + (int(delete_images), time.time()),
+            )
+            job_id = cursor.lastrowid if cursor.rowcount else None
+            if job_id is None:
+                row = self.db.execute(
+                    "SELECT id FROM jobs WHERE url = ? AND selection = ? AND output_format = ? AND create_pdf = ? AND status = ?",
+                    params + (JOB_FAILED,),
+                ).fetchone()
+                if row:
+                    job_id = row["id"]
+                    self.db.execute(
+                        "UPDATE jobs SET status = ?, error = NULL, finished_at = NULL, delete_images = ? WHERE id = ?",
+                        (JOB_QUEUED, int(delete_images), job_id),
+                    )
+                    # Chapters that used up their attempts get a fresh set
+                    self.db.execute(f"UPDATE chapters SET attempts = 0 WHERE job_id = ? AND status NOT IN {_FINISHED_SQL}", (job_id,))
+            self.db.commit()
+        return job_id
+
+    def pending_jobs(self):
+        """
+        Jobs still to run, oldest first: queued ones, incomplete ones, and ones left running by a
+        crash. Jobs that a live worker holds (through the job's lease or a chapter lease) are left
+        to it, by the same rule as claim_job.
+        """
+        now = time.time()
+        return self._query(
+            "SELECT * FROM jobs WHERE (status IN (?, ?) OR (status = ? AND (lease_expires IS NULL OR lease_expires < ?))) "
+            "AND NOT EXISTS (SELECT 1 FROM chapters WHERE chapters.job_id = jobs.id AND chapters.status = ? "
+            "AND chapters.lease_expires >= ?) ORDER BY id",
+            (JOB_QUEUED, JOB_INCOMPLETE, JOB_RUNNING, now, CHAPTER_LEASED, now),
+        )
+
+    def start_job(self, job_id, title, chapters):
+        """
+        Marks a job running and stores its selected chapters. On a resumed job the chapters
+        stored by the first run are kept, so a selection like 'latest 5' does not drift.
+        The job's lease is dropped: from here on workers lease its chapters instead.
+        """
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET status = ?, title = ?, started_at = COALESCE(started_at, ?), error = NULL, "
+                "worker = NULL, lease_expires = NULL WHERE id = ?",
+                (JOB_RUNNING, title, time.time(), job_id),
+            )
+            has_chapters = self.db.execute("SELECT 1 FROM chapters WHERE job_id = ? LIMIT 1", (job_id,)).fetchone()
+            if not has_chapters:
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO chapters (job_id, url, title, number, position, status, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(job_id, chapter.url, chapter.title, chapter.number, position, CHAPTER_QUEUED, time.time())
+                     for position, chapter in enumerate(chapters)],
+                )
+            self.db.commit()
+
+    def chapter_urls(self, job_id):
+        """URLs of all the job's selected chapters, in reading order."""
+        return [row["url"] for row in self._query("SELECT url FROM chapters WHERE job_id = ? ORDER BY position", (job_id,))]
+
+    def pending_chapter_urls(self, job_id):
+        """URLs of the job's chapters that are not finished yet, in reading order."""
+        rows = self._query(
+            f"SELECT url FROM chapters WHERE job_id = ? AND status NOT IN {_FINISHED_SQL} ORDER BY position",
+            (job_id,),
+        )
+        return [row["url"] for row in rows]
+
+    def chapter_finished(self, job_id, chapter_url, status):
+        self._execute(
+            "UPDATE chapters SET status = ?, updated_at = ? WHERE job_id = ? AND url = ?",
+            (status, time.time(), job_id, chapter_url),
+        )
+
+    def finish_job(self, job_id, error=None):
+        """Marks a job done if all its chapters finished, incomplete if some did not, or failed with `error`."""
+        if error:
+            status = JOB_FAILED
+        else:
+            status = JOB_DONE if not self.pending_chapter_urls(job_id) else JOB_INCOMPLETE
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id),
+        )
+        return status
+
+    def claim_job(self, worker_id, lease_seconds):
+        """
+        Leases a job whose chapters have not been selected yet (queued, or left mid-selection by
+        a dead worker) to `worker_id`. Returns the job row, or None.
+        """
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute(
+                    "SELECT * FROM jobs WHERE status = ? OR (status = ? AND (lease_expires IS NULL OR lease_expires < ?) "
+                    "AND NOT EXISTS (SELECT 1 FROM chapters WHERE chapters.job_id = jobs.id)) ORDER BY id LIMIT 1",
+                    (JOB_QUEUED, JOB_RUNNING, now),
+                ).fetchone()
+                if row is not None:
+                    self.db.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, lease_expires = ? WHERE id = ?",
+                        (JOB_RUNNING, worker_id, now + lease_seconds, row["id"]),
+                    )
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+        return row
+
+    def claim_chapters(self, worker_id, limit, lease_seconds, max_attempts):
+        """
+        Leases up to `limit` unfinished chapters of one running job to `worker_id`: chapters never
+        tried, ones that ended incomplete or failed with attempts left, and ones whose lease
+        expired. Returns (job row, chapter rows in reading order), or (None, []).
+        """
+        now = time.time()
+        claimable = (
+            f"chapters.status NOT IN {_FINISHED_SQL} AND chapters.attempts < ? "
+            "AND (chapters.status != ? OR chapters.lease_expires IS NULL OR chapters.lease_expires < ?)"
+        )
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                first = self.db.execute(
+                    f"SELECT chapters.job_id FROM chapters JOIN jobs ON jobs.id = chapters.job_id "
+                    f"WHERE jobs.status IN (?, ?) AND {claimable} ORDER BY chapters.job_id, chapters.position LIMIT 1",
+                    (JOB_RUNNING, JOB_INCOMPLETE, max_attempts, CHAPTER_LEASED, now),
+                ).fetchone()
+                if first is None:
+                    self.db.commit()
+                    return None, []
+                job_id = first["job_id"]
+                rows = self.db.execute(
+                    f"SELECT * FROM chapters WHERE job_id = ? AND {claimable} ORDER BY position LIMIT ?",
+                    (job_id, max_attempts, CHAPTER_LEASED, now, limit),
+                ).fetchall()
+                self.db.executemany(
+                    "UPDATE chapters SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE job_id = ? AND url = ?",
+                    [(CHAPTER_LEASED, worker_id, now + lease_seconds, now, job_id, row["url"]) for row in rows],
+                )
+                job = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+        return job, rows
+
+    def heartbeat(self, worker_id, lease_seconds):
+        """Renews every lease held by `worker_id`; returns the number of chapters it still holds."""
+        expires = time.time() + lease_seconds
+        with self.lock:
+            self.db.execute("UPDATE jobs SET lease_expires = ? WHERE worker = ? AND status = ?", (expires, worker_id, JOB_RUNNING))
+            held = self.db.execute(
+                "UPDATE chapters SET lease_expires = ? WHERE worker = ? AND status = ?", (expires, worker_id, CHAPTER_LEASED)
+            ).rowcount
+            self.db.commit()
+            return held
+
+    def release(self, worker_id):
+        """Hands the chapters leased by a stopping worker back to the queue, without counting the attempt."""
+        self._execute(
+            "UPDATE chapters SET status = ?, worker = NULL, lease_expires = NULL, attempts = MAX(attempts - 1, 0) "
+            "WHERE worker = ? AND status = ?",
+            (CHAPTER_QUEUED, worker_id, CHAPTER_LEASED),
+        )
+
+    def settle_job(self, job_id, max_attempts):
+        """
+        Finishes a job once none of its chapters is leased or has attempts left (see finish_job).
+        Returns the job's new status, or None while work remains.
+        """
+        active = self._query(
+            f"SELECT 1 FROM chapters WHERE job_id = ? AND status NOT IN {_FINISHED_SQL} "
+            "AND ((status = ? AND lease_expires >= ?) OR attempts < ?) LIMIT 1",
+            (job_id, CHAPTER_LEASED, time.time(), max_attempts),
+        )
+        return None if active else self.finish_job(job_id)
+
+    def has_active_work(self):
+        """True while any job is queued or any lease is live, i.e. while an idle worker should keep polling."""
+        now = time.time()
+        return bool(self._query(
+            "SELECT 1 FROM jobs WHERE status = ? OR (status = ? AND lease_expires >= ?) "
+            "UNION ALL SELECT 1 FROM chapters WHERE status = ? AND lease_expires >= ? LIMIT 1",
+            (JOB_QUEUED, JOB_RUNNING, now, CHAPTER_LEASED, now),
+        ))
+
+    def status(self):
+        """Every job with its chapter counts (finished, currently leased by workers), for `batch --status`."""
+        return self._query(
+            "SELECT jobs.id, jobs.url, jobs.title, jobs.selection, jobs.status, jobs.error, "
+            f"COUNT(chapters.url) AS chapters, SUM(CASE WHEN chapters.status IN {_FINISHED_SQL} THEN 1 ELSE 0 END) AS finished, "
+            "SUM(CASE WHEN chapters.status = ? AND chapters.lease_expires >= ? THEN 1 ELSE 0 END) AS leased "
+            "FROM jobs LEFT JOIN chapters ON chapters.job_id = jobs.id GROUP BY jobs.id ORDER BY jobs.id",
+            (CHAPTER_LEASED, time.time()),
+        )
+
+    def close(self):
+        with self.lock:
+            self.db.close()
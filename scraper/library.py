@@ -0,0 +1,57 @@
+"""
+📚 Local library index (which series and chapters are already mirrored)
+"""
+
+import json
+import os
+import threading
+import time
+
+from utils.config import DOWNLOAD_DIR
+
+LIBRARY_INDEX_NAME = "library.json"
+
+class LibraryIndex:
+    """
+    Maps each mirrored series URL to its title and the chapter URLs already on disk,
+    so `sync` can queue only newly released chapters.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DOWNLOAD_DIR, LIBRARY_INDEX_NAME)
+        self.lock = threading.Lock()
+        self.series = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.series = json.load(f).get("series", {})
+        except (OSError, ValueError):
+            self.series = {}
+
+    def save(self):
+        """Writes the index atomically."""
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"series": self.series}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def series_urls(self):
+        with self.lock:
+            return list(self.series)
+
+    def known_chapter_urls(self, series_url):
+        with self.lock:
+            return set(self.series.get(series_url, {}).get("chapters", {}))
+
+    def record_chapters(self, series_url, title, chapters):
+        """Records chapters of a series as mirrored."""
+        with self.lock:
+            entry = self.series.setdefault(series_url, {"title": title, "chapters": {}})
+            entry["title"] = title
+            entry["last_sync"] = time.time()
+            for chapter in chapters:
+                entry["chapters"][chapter.url] = {"title": chapter.title, "number": chapter.number}
@@ -0,0 +1,95 @@
+"""
+📒 Per-chapter download manifest (resume and skip-existing support)
+"""
+
+import json
+import os
+import threading
+
+MANIFEST_NAME = ".manifest.json"
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_PARTIAL = "partial"
+STATUS_COMPLETE = "complete"
+
+class ChapterManifest:
+    """
+    Records which images of a chapter have been downloaded (URL, index, file name,
+    byte size, SHA-256 and status) so reruns can skip completed work without
+    touching the network.
+    """
+
+    def __init__(self, folder_path, chapter_url=None):
+        self.folder_path = folder_path
+        self.path = os.path.join(folder_path, MANIFEST_NAME)
+        self.lock = threading.Lock()
+        self.data = {"chapter_url": chapter_url, "status": STATUS_PARTIAL, "image_count": None, "images": {}}
+        self.load()
+        if chapter_url:
+            self.data["chapter_url"] = chapter_url
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """Writes the manifest atomically so a crash never leaves it half-written."""
+        with self.lock:
+            os.makedirs(self.folder_path, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def is_complete(self):
+        return self.data.get("status") == STATUS_COMPLETE
+
+    def completed_image(self, index, url):
+        """Returns the saved path of image `index` if it was already downloaded from `url`, else None."""
+        entry = self.data["images"].get(str(index))
+        if not entry or entry.get("status") != STATUS_DONE or entry.get("url") != url:
+            return None
+        file_path = os.path.join(self.folder_path, entry["file"])
+        return file_path if os.path.exists(file_path) else None
+
+    def record_image(self, index, url, file_name=None, size=None, sha256=None, status=STATUS_DONE):
+        with self.lock:
+            self.data["images"][str(index)] = {
+                "index": index,
+                "url": url,
+                "file": file_name,
+                "size": size,
+                "sha256": sha256,
+                "status": status,
+            }
+        self.save()
+
+    def replace_files(self, replacements):
+        """Points entries at recompressed copies; `replacements` maps old file names to (new name, size, sha256)."""
+        with self.lock:
+            for entry in self.data["images"].values():
+                replacement = replacements.get(entry.get("file"))
+                if replacement:
+                    entry["file"], entry["size"], entry["sha256"] = replacement
+        self.save()
+
+    def finish(self, image_count):
+        """Marks the chapter complete if every one of its `image_count` images is done."""
+        with self.lock:
+            self.data["image_count"] = image_count
+            done = sum(1 for entry in self.data["images"].values() if entry.get("status") == STATUS_DONE)
+            self.data["status"] = STATUS_COMPLETE if done >= image_count else STATUS_PARTIAL
+        self.save()
+        return self.is_complete()
+
+def is_chapter_complete(chapter_folder):
+    """O(1) check, without network access, for whether a chapter was fully downloaded."""
+    try:
+        with open(os.path.join(chapter_folder, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f).get("status") == STATUS_COMPLETE
+    except (OSError, ValueError):
+        return False
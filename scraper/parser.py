@@ -2,13 +2,47 @@
 🧠 Parses HTML and extracts manga, chapters, and images
 """
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from scraper.chapters import extract_chapters
+from utils import config
 from utils.logger import log_error, log_success
+from utils.metrics import timed
 
-def parse_search_results(html):
+try:
+    import lxml  # noqa: F401 (optional, much faster tree builder)
+    DEFAULT_BACKEND = "lxml"
+except ImportError:
+    DEFAULT_BACKEND = "html.parser"
+
+def _has_class(*names):
+    """
+    Strainer filter matching any of the CSS classes `names`. While parsing, bs4 hands
+    strainers the raw attribute string ("wp-manga-chapter has-thumb", or with trailing
+    spaces), so a plain class_ string would only match elements with exactly that class.
+    """
+    wanted = set(names)
+
+    def match(value):
+        if not value:
+            return False
+        classes = value.split() if isinstance(value, str) else value
+        return not wanted.isdisjoint(classes)
+    return match
+
+# Each parser only builds the subtree it reads instead of the whole page
+SEARCH_RESULTS_STRAINER = SoupStrainer("div", class_=_has_class("page-item-detail"))
+MANGA_DETAILS_STRAINER = SoupStrainer(class_=_has_class("post-title", "wp-manga-chapter"))
+CHAPTER_IMAGES_STRAINER = SoupStrainer("div", class_=_has_class("reading-content"))
+
+def make_soup(html, parse_only=None, backend=None):
+    """Builds a BeautifulSoup tree with the configured backend (lxml when available, else html.parser)."""
+    return BeautifulSoup(html, backend or config.HTML_PARSER or DEFAULT_BACKEND, parse_only=parse_only)
+
+@timed("parse_search_results")
+def parse_search_results(html, backend=None):
     """Parses search results from HTML content."""
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, SEARCH_RESULTS_STRAINER, backend)
         results = []
         for item in soup.find_all("div", class_="page-item-detail manga"):
             title_tag = item.find("h3", class_="h5").find("a")
@@ -22,12 +56,11 @@ def parse_search_results(html):
         log_error(f"Failed to parse search results: {e}")
         return []
 
-import re
-
-def parse_manga_details(html):
+@timed("parse_manga_details")
+def parse_manga_details(html, backend=None):
     """Parses manga details from HTML content."""
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, MANGA_DETAILS_STRAINER, backend)
         title_element = soup.find("div", class_="post-title").find("h1")
         
         # Clones the title element and removes any span elements within it
@@ -37,78 +70,13 @@ def parse_manga_details(html):
             span.decompose()
         
         title = title_clone.get_text(strip=True)
-        
-        chapters = []
-        for chapter_item in soup.find_all("li", class_="wp-manga-chapter"):
-            chapter_title = chapter_item.find("a").text.strip()
-            chapter_url = chapter_item.find("a")["href"]
-            
-            chapter_number = 0.0 # Default if no number is found
-            is_side_story = False
-            side_story_original_num = 0 # To store the number from "Side Story X"
-            import re
 
-            # Try to match "Chapter X" (e.g., Chapter 1, Chapter 0, Chapter 1.5)
-            match_chapter = re.search(r'Chapter\s*(\d+(\.\d+)?)', chapter_title, re.IGNORECASE)
-            if match_chapter:
-                try:
-                    chapter_number = float(match_chapter.group(1))
-                except ValueError:
-                    pass
-            # If not a main chapter, try to match "Side Story X"
-            else:
-                match_side_story = re.search(r'Side Story\s*(\d+)', chapter_title, re.IGNORECASE)
-                if match_side_story:
-                    is_side_story = True
-                    try:
-                        side_story_original_num = int(match_side_story.group(1))
-                    except ValueError:
-                        pass
-                # Handle other cases where no number is found, assign a very low number
-                else:
-                    chapter_number = -1.0 # Assign a negative value for truly unnumbered chapters
-
-            chapters.append({
-                "title": chapter_title,
-                "url": chapter_url,
-                "number": chapter_number,
-                "is_side_story": is_side_story,
-                "side_story_original_num": side_story_original_num # Store original side story number
-            })
-        
-        main_chapters = []
-        side_stories = []
-        for chapter in chapters:
-            if chapter["is_side_story"]:
-                side_stories.append(chapter)
-            else:
-                main_chapters.append(chapter)
-
-        # Sort main chapters
-        main_chapters.sort(key=lambda x: x["number"])
-
-        # Sort side stories by their original number
-        side_stories.sort(key=lambda x: x["side_story_original_num"])
-
-        # Find the maximum main chapter number
-        max_main_chapter_number = 0.0
-        if main_chapters:
-            max_main_chapter_number = main_chapters[-1]["number"] # Last chapter in sorted main_chapters
-
-        # Re-assign numbers for side stories
-        import math
-        start_side_story_number = math.ceil(max_main_chapter_number)
-        if start_side_story_number <= max_main_chapter_number:
-            start_side_story_number += 1.0
-
-        for i, chapter in enumerate(side_stories):
-            chapter["number"] = start_side_story_number + i
-            # Remove the temporary key
-            del chapter["side_story_original_num"]
+        entries = []
+        for chapter_item in soup.find_all("li", class_="wp-manga-chapter"):
+            link = chapter_item.find("a")
+            entries.append((link.text.strip(), link["href"]))
 
-        # Combine and sort all chapters
-        all_chapters = main_chapters + side_stories
-        all_chapters.sort(key=lambda x: x["number"])
+        all_chapters = extract_chapters(entries)
 
         log_success(f"Parsed {len(all_chapters)} chapters for manga: {title}")
         return {"title": title, "chapters": all_chapters}
@@ -116,10 +84,11 @@ def parse_manga_details(html):
         log_error(f"Failed to parse manga details: {e}")
         return None
 
-def parse_chapter_images(html):
+@timed("parse_chapter_images")
+def parse_chapter_images(html, backend=None):
     """Parses chapter images from HTML content."""
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, CHAPTER_IMAGES_STRAINER, backend)
         images = []
         reading_content = soup.find("div", class_="reading-content")
         if reading_content:
@@ -142,7 +111,7 @@ if __name__ == "__main__":
         manga_details = parse_manga_details(html_content)
         if manga_details and manga_details["chapters"]:
             # Test parsing images from the first chapter
-            first_chapter_url = manga_details["chapters"][0]["url"]
+            first_chapter_url = manga_details["chapters"][0].url
             chapter_html = fetch_html(first_chapter_url)
             if chapter_html:
                 images = parse_chapter_images(chapter_html)
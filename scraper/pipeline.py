@@ -0,0 +1,204 @@
+"""
+🏭 Staged download pipeline (chapter resolvers feeding a shared image worker pool)
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scraper.downloader import (
+    chapter_paths, download_image, download_image_to_cbz, finish_chapter, finish_cbz_chapter, should_skip_chapter,
+)
+from scraper.fetcher import fetch_html
+from scraper.manifest import ChapterManifest
+from scraper.parser import parse_chapter_images
+from scraper.session import get_user_agent
+from utils import config
+from utils.cbz_writer import OrderedCbzWriter
+from utils.logger import log_info, log_error, log_progress
+from utils.metrics import get_metrics
+
+_STOP = object()
+
+# Sort keys for queued image tasks, lowest first:
+#   chapter      - finish chapter N before chapter N+1 gets the bandwidth
+#   round-robin  - page 1 of every queued chapter, then page 2, ...
+#   smallest     - chapters with the fewest images first
+PRIORITY_POLICIES = {
+    "chapter": lambda job, index: (job.seq, index),
+    "round-robin": lambda job, index: (index, job.seq),
+    "smallest": lambda job, index: (len(job.image_urls), job.seq, index),
+}
+# Sorts after every real task, so workers only stop once the queue is drained
+_STOP_KEY = (float("inf"),)
+
+class ChapterJob:
+    """A chapter whose image URLs are known, tracked until its last image finishes."""
+
+    def __init__(self, seq, chapter, image_urls, manga_title, output_format):
+        self.seq = seq
+        self.chapter = chapter
+        self.image_urls = image_urls
+        self.manga_folder, self.chapter_folder = chapter_paths(manga_title, chapter.title)
+        self.lock = threading.Lock()
+        self.remaining = len(image_urls)
+        self.downloaded_paths = []
+        self.succeeded = 0
+        self.manifest = None
+        self.writer = None
+        if output_format == "cbz":
+            self.writer = OrderedCbzWriter(os.path.join(self.manga_folder, f"{chapter.title}.cbz"))
+        else:
+            self.manifest = ChapterManifest(self.chapter_folder, chapter.url)
+
+    def image_done(self, result):
+        """Records one finished image; returns True for the chapter's last image."""
+        with self.lock:
+            if result:
+                self.succeeded += 1
+                if isinstance(result, str):
+                    self.downloaded_paths.append(result)
+            self.remaining -= 1
+            get_metrics().record_image(self.chapter.title, bool(result))
+            # Reported under the lock so progress lines never go backwards
+            log_progress(self.chapter.title, len(self.image_urls) - self.remaining, len(self.image_urls))
+            return self.remaining == 0
+
+class DownloadPipeline:
+    """
+    Downloads chapters in two stages. A small resolver pool fetches and parses chapter
+    pages ahead of time and feeds (chapter, index, url) tasks into a bounded queue; a
+    shared pool of image workers drains it, so images from different chapters interleave
+    and the connection never idles between chapters. Queued images are handed out in the
+    order of the `priority` policy (see PRIORITY_POLICIES).
+    """
+
+    def __init__(self, manga_title, create_pdf=False, delete_images=False, converter=None, output_format="images",
+                 on_chapter_done=None, priority=None):
+        self.manga_title = manga_title
+        self.create_pdf = create_pdf
+        self.delete_images = delete_images
+        self.converter = converter
+        self.output_format = output_format
+        self.on_chapter_done = on_chapter_done
+        self.image_workers = max(int(config.DOWNLOAD_THREADS), 1)
+        self.resolver_workers = max(int(config.RESOLVER_THREADS), 1)
+        self.priority = priority or config.DOWNLOAD_PRIORITY
+        if self.priority not in PRIORITY_POLICIES:
+            raise ValueError(f"Unknown priority policy: {self.priority}. Use one of: {', '.join(PRIORITY_POLICIES)}.")
+        self.priority_key = PRIORITY_POLICIES[self.priority]
+        self.tasks = queue.PriorityQueue(maxsize=max(int(config.IMAGE_QUEUE_SIZE), 1))
+        # Tie-breaker so equal keys never fall through to comparing jobs
+        self.counter = itertools.count()
+        self.user_agent = None
+        self.started_at = None
+        self.first_complete_after = None
+        self.completed = 0
+        self.stats_lock = threading.Lock()
+
+    def _report(self, message, error=False):
+        (log_error if error else log_info)(message)
+
+    def _chapter_finished(self, chapter, status):
+        if status == "complete":
+            with self.stats_lock:
+                self.completed += 1
+                if self.first_complete_after is None:
+                    self.first_complete_after = time.monotonic() - self.started_at
+        if self.on_chapter_done:
+            self.on_chapter_done(chapter, status)
+
+    def _resolve(self, seq, chapter):
+        """Stage 1: turns a chapter into image tasks."""
+        if should_skip_chapter(self.manga_title, chapter.title, self.create_pdf, self.output_format):
+            self._report(f"Skipping chapter {chapter.title} (already downloaded)")
+            self._chapter_finished(chapter, "skipped")
+            return
+
+        self._report(f"Processing chapter: {chapter.title}")
+        chapter_html = fetch_html(chapter.url)
+        if not chapter_html:
+            self._report(f"Skipping chapter {chapter.title} (could not fetch)", error=True)
+            self._chapter_finished(chapter, "failed")
+            return
+
+        image_urls = parse_chapter_images(chapter_html)
+        if not image_urls:
+            self._report(f"Skipping chapter {chapter.title} (no images found)", error=True)
+            self._chapter_finished(chapter, "failed")
+            return
+
+        job = ChapterJob(seq, chapter, image_urls, self.manga_title, self.output_format)
+        # Blocks while the queue is full, which bounds how far resolvers run ahead
+        for index, img_url in enumerate(image_urls, 1):
+            self.tasks.put((self.priority_key(job, index), next(self.counter), (job, index, img_url)))
+
+    def _resolve_safely(self, seq, chapter):
+        try:
+            self._resolve(seq, chapter)
+        except Exception as e:
+            self._report(f"Skipping chapter {chapter.title} ({e})", error=True)
+            self._chapter_finished(chapter, "failed")
+
+    def _image_worker(self):
+        """Stage 2: downloads images from any chapter until told to stop."""
+        while True:
+            _, _, task = self.tasks.get()
+            if task is _STOP:
+                return
+            job, index, img_url = task
+            try:
+                if job.writer:
+                    result = download_image_to_cbz(img_url, job.writer, index, job.chapter.url, self.user_agent)
+                else:
+                    result = download_image(img_url, job.chapter_folder, index, job.chapter.url, self.user_agent, job.manifest)
+            except Exception as e:
+                log_error(f"Failed to download {img_url}: {e}")
+                result = None
+            if job.image_done(result):
+                self._finish(job)
+
+    def _finish(self, job):
+        try:
+            if job.writer:
+                complete = finish_cbz_chapter(job.chapter.title, job.writer, job.succeeded, len(job.image_urls)) is not None
+            else:
+                downloaded_paths = sorted(job.downloaded_paths)
+                finish_chapter(job.chapter.title, job.manga_folder, job.manifest, len(job.image_urls), downloaded_paths,
+                               self.create_pdf, self.delete_images, self.converter)
+                complete = job.manifest.is_complete()
+            self._chapter_finished(job.chapter, "complete" if complete else "incomplete")
+        except Exception as e:
+            self._report(f"Failed to finish chapter {job.chapter.title}: {e}", error=True)
+            self._chapter_finished(job.chapter, "failed")
+
+    def run(self, chapters):
+        """Downloads `chapters` and returns once every chapter has finished."""
+        # Use the shared session's user agent so challenge cookies stay valid
+        self.user_agent = get_user_agent()
+        self.started_at = time.monotonic()
+
+        workers = [threading.Thread(target=self._image_worker, daemon=True) for _ in range(self.image_workers)]
+        for worker in workers:
+            worker.start()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.resolver_workers) as resolvers:
+                for seq, chapter in enumerate(chapters):
+                    resolvers.submit(self._resolve_safely, seq, chapter)
+        finally:
+            for _ in workers:
+                self.tasks.put((_STOP_KEY, next(self.counter), _STOP))
+            for worker in workers:
+                worker.join()
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        if self.first_complete_after is None:
+            first = "no chapter completed"
+        else:
+            first = f"first chapter complete after {self.first_complete_after:.1f}s"
+        return f"Pipeline ({self.priority} priority): {self.completed} chapters complete in {elapsed:.1f}s, {first}"
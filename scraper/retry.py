@@ -0,0 +1,138 @@
+"""
+🔁 Retry policy (exponential backoff, jitter, Retry-After, per-job budget)
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+import urllib3
+
+from utils import config
+from utils.logger import log_info
+from utils.metrics import get_metrics
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+class RetryBudget:
+    """
+    Caps the total number of retries for one job (a scrape run), so a dead host
+    fails fast instead of stalling the whole run on backoff sleeps.
+    """
+
+    def __init__(self, max_retries):
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.used = 0
+        self.counts = {"connect": 0, "read": 0, "status": 0}
+        self.exhausted = 0
+
+    def consume(self, kind):
+        """Takes one retry from the budget. Returns False once the budget is spent."""
+        with self.lock:
+            if self.used >= self.max_retries:
+                self.exhausted += 1
+                return False
+            self.used += 1
+            self.counts[kind] += 1
+            return True
+
+    def summary(self):
+        with self.lock:
+            return (
+                f"Retries: {self.used} (connect {self.counts['connect']}, read {self.counts['read']}, "
+                f"status {self.counts['status']}), budget exhausted {self.exhausted} times"
+            )
+
+def classify_error(error):
+    """
+    Returns the failure kind of a request exception ('connect', 'read' or 'status'),
+    or None if it should not be retried.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        if response is not None and response.status_code in RETRYABLE_STATUS_CODES:
+            return "status"
+        return None
+    if isinstance(error, (requests.exceptions.ConnectTimeout, requests.exceptions.SSLError)):
+        return "connect"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        # requests also raises ConnectionError for read timeouts and resets while streaming a body
+        reason = error.args[0] if error.args else None
+        if isinstance(reason, (urllib3.exceptions.ReadTimeoutError, urllib3.exceptions.ProtocolError)):
+            return "read"
+        return "connect"
+    if isinstance(error, (requests.exceptions.ReadTimeout, requests.exceptions.ChunkedEncodingError,
+                          requests.exceptions.ContentDecodingError)):
+        return "read"
+    return None
+
+def retry_after_seconds(response):
+    """Parses the Retry-After header of a response (seconds or HTTP date) into seconds, or None."""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, kind, base=None, cap=None):
+    """
+    Full-jitter exponential backoff. Connect failures back off from the base delay,
+    read failures retry sooner and throttling statuses back off hardest.
+    """
+    base = config.RETRY_DELAY if base is None else base
+    cap = config.RETRY_MAX_DELAY if cap is None else cap
+    factor = {"connect": 1.0, "read": 0.5, "status": 2.0}[kind]
+    return random.uniform(0, min(cap, base * factor * (2 ** attempt)))
+
+_budget = None
+_budget_lock = threading.Lock()
+
+def start_retry_budget(max_retries=None):
+    """Starts a fresh retry budget for a new job and returns it."""
+    global _budget
+    with _budget_lock:
+        _budget = RetryBudget(config.RETRY_BUDGET if max_retries is None else max_retries)
+        return _budget
+
+def get_retry_budget():
+    """Returns the retry budget of the current job."""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = RetryBudget(config.RETRY_BUDGET)
+    return _budget
+
+def with_retries(fn, url, retries=None):
+    """
+    Calls `fn()` and retries it on transient failures, honouring Retry-After and the
+    job's retry budget. Non-retryable errors and the last failure are re-raised.
+    """
+    retries = config.RETRY_COUNT if retries is None else retries
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            kind = classify_error(e)
+            if kind is None or attempt >= retries or not get_retry_budget().consume(kind):
+                raise
+            get_metrics().count(f"retries_{kind}")
+            delay = backoff_delay(attempt, kind)
+            if kind == "status":
+                delay = max(delay, retry_after_seconds(e.response) or 0.0)
+            delay = min(delay, config.RETRY_MAX_DELAY)
+            log_info(f"Retrying {url} in {delay:.1f}s ({kind} failure: {e})")
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,109 @@
+"""
+🚦 Global request budget (in-flight cap, per-host caps, token-bucket rate limits)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from utils import config
+
+class TokenBucket:
+    """Thread-safe token bucket. `rate` tokens are added per second, up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst else max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Takes one token and returns how long the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+class HostBudget:
+    """Concurrency cap and rate limit for a single host."""
+
+    def __init__(self, concurrency, rate, burst=None):
+        self.concurrency = max(int(concurrency), 1)
+        self.semaphore = threading.BoundedSemaphore(self.concurrency)
+        self.bucket = TokenBucket(rate, burst)
+
+class RequestScheduler:
+    """
+    Owns the request budget shared by every chapter and image worker.
+    The Toonily HTML host and the image CDN hosts get separate per-host budgets.
+    """
+
+    def __init__(self, max_in_flight, html_concurrency, html_rate, image_concurrency, image_rate, html_host=None):
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self.global_semaphore = threading.BoundedSemaphore(self.max_in_flight)
+        self.html_host = html_host or urlsplit(config.BASE_URL).netloc
+        self.html_limits = (html_concurrency, html_rate)
+        self.image_limits = (image_concurrency, image_rate)
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def is_html_host(self, host):
+        return host == self.html_host or host.endswith("." + self.html_host)
+
+    def host_budget(self, url):
+        """Returns the budget for the host of `url`, creating it on first use."""
+        host = urlsplit(url).netloc
+        with self.lock:
+            budget = self.hosts.get(host)
+            if budget is None:
+                concurrency, rate = self.html_limits if self.is_html_host(host) else self.image_limits
+                budget = HostBudget(concurrency, rate)
+                self.hosts[host] = budget
+            return budget
+
+    @contextmanager
+    def slot(self, url):
+        """Blocks until a request to `url` fits within the rate limit and concurrency caps."""
+        budget = self.host_budget(url)
+        delay = budget.bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        with budget.semaphore:
+            with self.global_semaphore:
+                yield
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def _build_scheduler(max_in_flight=None):
+    return RequestScheduler(
+        max_in_flight or config.MAX_IN_FLIGHT_REQUESTS,
+        config.HTML_HOST_CONCURRENCY,
+        config.HTML_HOST_RATE,
+        config.IMAGE_HOST_CONCURRENCY,
+        config.IMAGE_HOST_RATE,
+    )
+
+def configure_scheduler(max_in_flight=None):
+    """(Re)creates the shared scheduler from `utils.config`, optionally overriding the global cap."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = _build_scheduler(max_in_flight)
+        return _scheduler
+
+def get_scheduler():
+    """Returns the shared scheduler, creating it from `utils.config` on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = _build_scheduler()
+    return _scheduler
@@ -0,0 +1,105 @@
+"""
+🎯 Chapter selection expressions ("1,5-7", "100-", "!5", "s2:1-10", "latest 10", "side", "all")
+"""
+
+import math
+import re
+from bisect import bisect_left, bisect_right
+
+from scraper.chapters import KIND_MAIN
+
+NUMBER_RE = re.compile(r'^-?\d+(?:\.\d+)?$')
+# "s2:1-10" addresses season 2; unprefixed numbers and ranges address season 1
+SEASON_TERM_RE = re.compile(r'^s(\d+)(?:\s*:\s*(.+))?$')
+RANGE_RE = re.compile(r'^(-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)?$')
+LATEST_RE = re.compile(r'^(?:latest|last)\s*:?\s*(\d+)$', re.IGNORECASE)
+SIDE_STORY_TOKENS = {"side", "sides", "side-stories", "side stories", "extras"}
+
+SELECTION_HELP = "e.g. 1, 5-7, 10.5, 100-, !12, s2:1-10, latest 5, side, all"
+
+class ChapterIndex:
+    """
+    Sorted index over a series' chapters, keyed by (season, number), so every selection
+    term is a dict lookup or a bisect instead of a scan of the whole chapter list.
+    """
+
+    def __init__(self, chapters):
+        self.chapters = list(chapters)
+        order = sorted(range(len(self.chapters)), key=lambda i: self.chapters[i].key)
+        self.keys = [self.chapters[i].key for i in order]
+        self.positions = order
+        # Newest releases last; side stories and extras are numbered after the main story, so they are left out
+        self.main_positions = [i for i in order if self.chapters[i].kind == KIND_MAIN]
+        self.by_key = {}
+        for position, chapter in enumerate(self.chapters):
+            self.by_key.setdefault(chapter.key, []).append(position)
+
+    def _span(self, season, start, end):
+        """Positions of the chapters of `season` numbered start..end (inclusive)."""
+        lo = bisect_left(self.keys, (season, start))
+        hi = bisect_right(self.keys, (season, end))
+        return self.positions[lo:hi]
+
+    def _numbered(self, term, season):
+        """Positions selected by a chapter number or range within `season`, or None if `term` is neither."""
+        if NUMBER_RE.match(term):
+            positions = self.by_key.get((season, float(term)))
+            if not positions:
+                raise ValueError(f"Chapter {term if season == 1 else f's{season}:{term}'} not found.")
+            return positions
+
+        match = RANGE_RE.match(term)
+        if match:
+            end = float(match.group(2)) if match.group(2) else math.inf
+            return self._span(season, float(match.group(1)), end)
+        return None
+
+    def _match(self, term):
+        """Returns the list positions selected by a single term."""
+        if term == "all":
+            return range(len(self.chapters))
+
+        if term in SIDE_STORY_TOKENS:
+            return [i for i, chapter in enumerate(self.chapters) if chapter.is_side_story]
+
+        match = LATEST_RE.match(term)
+        if match:
+            count = int(match.group(1))
+            return self.main_positions[max(len(self.main_positions) - count, 0):]
+
+        match = SEASON_TERM_RE.match(term)
+        if match:
+            season = int(match.group(1))
+            positions = self._numbered(match.group(2).strip(), season) if match.group(2) else self._span(season, -math.inf, math.inf)
+        else:
+            positions = self._numbered(term, 1)
+        if positions is None:
+            raise ValueError(f"Invalid chapter selection: '{term}' ({SELECTION_HELP}).")
+        return positions
+
+    def select(self, expression):
+        """
+        Resolves a comma-separated selection expression to chapters, in reading order.
+        Terms prefixed with '!' are excluded; an expression of only exclusions starts from all chapters.
+        Raises ValueError for malformed terms and unknown chapter numbers.
+        """
+        included = set()
+        excluded = set()
+        has_inclusions = False
+        for raw_term in expression.split(","):
+            term = raw_term.strip().lower()
+            if not term:
+                continue
+            if term.startswith("!"):
+                excluded.update(self._match(term[1:].strip()))
+            else:
+                has_inclusions = True
+                included.update(self._match(term))
+
+        if not has_inclusions:
+            included = set(range(len(self.chapters))) if excluded else set()
+        return [self.chapters[i] for i in sorted(included - excluded)]
+
+def select_chapters(chapters, expression):
+    """Convenience wrapper: builds an index over `chapters` and resolves `expression`."""
+    return ChapterIndex(chapters).select(expression)
@@ -0,0 +1,58 @@
+"""
+🔌 Shared cloudscraper sessions (keep-alive pools, challenge cookie reuse)
+"""
+
+import threading
+import cloudscraper
+
+from utils import config
+
+BROWSER = {'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# Cookies (including Cloudflare clearance cookies) and headers are shared by
+# every session so a challenge solved on one thread is reused by all others.
+_shared_cookies = None
+_shared_headers = None
+
+def _pool_size():
+    """Connection pool size, sized to the configured worker count."""
+    return max(int(config.DOWNLOAD_THREADS), 1)
+
+def _create_scraper():
+    """Creates a new cloudscraper session wired to the shared cookie jar and headers."""
+    global _shared_cookies, _shared_headers
+
+    scraper = cloudscraper.create_scraper(browser=BROWSER)
+
+    # Re-initialise the pool managers of the mounted adapters (cloudscraper's own
+    # cipher suite adapter included) so keep-alive pools match the worker count.
+    pool_size = _pool_size()
+    for adapter in scraper.adapters.values():
+        adapter.init_poolmanager(pool_size, pool_size)
+
+    with _lock:
+        if _shared_cookies is None:
+            _shared_cookies = scraper.cookies
+            _shared_headers = scraper.headers.copy()
+        else:
+            # Challenge cookies are bound to the User-Agent, so every session must present the same one
+            scraper.cookies = _shared_cookies
+            scraper.headers.clear()
+            scraper.headers.update(_shared_headers)
+
+    return scraper
+
+def get_scraper():
+    """Returns the cloudscraper session for the current thread, creating it on first use."""
+    scraper = getattr(_local, "scraper", None)
+    if scraper is None:
+        scraper = _create_scraper()
+        _local.scraper = scraper
+    return scraper
+
+def get_user_agent():
+    """Returns the User-Agent shared by all sessions."""
+    return get_scraper().headers.get("User-Agent")
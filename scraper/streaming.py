@@ -0,0 +1,67 @@
+"""
+🚿 Streams response bodies to disk through one reusable buffer
+"""
+
+import requests
+import urllib3
+
+from utils import config
+
+def expected_length(response):
+    """The body size promised by Content-Length, or None when it is missing or the body is encoded."""
+    if response.headers.get("content-encoding", "identity").lower() != "identity":
+        return None
+    try:
+        return int(response.headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+def iter_body(response, chunk_size=None):
+    """
+    Yields the body of a streamed response as memoryviews over a single reusable buffer,
+    filled with `readinto`, so a multi-megabyte strip costs a few large reads instead of
+    hundreds of small bytes objects. Each view is only valid until the next one is yielded.
+    urllib3 read errors are re-raised as requests exceptions so the retry policy sees them.
+    """
+    chunk_size = chunk_size or config.IMAGE_CHUNK_SIZE
+    raw = response.raw
+    if not hasattr(raw, "readinto"):
+        yield from response.iter_content(chunk_size)
+        return
+
+    raw.decode_content = True
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    try:
+        while True:
+            count = raw.readinto(buffer)
+            if not count:
+                return
+            yield view[:count]
+    except urllib3.exceptions.DecodeError as e:
+        raise requests.exceptions.ContentDecodingError(e)
+    except (urllib3.exceptions.ReadTimeoutError, urllib3.exceptions.ProtocolError) as e:
+        raise requests.exceptions.ConnectionError(e)
+
+def stream_to_file(response, file_obj, digest=None, chunk_size=None):
+    """
+    Writes a streamed response body to `file_obj` (updating `digest` along the way) and
+    returns the number of bytes written. Raises ConnectionError if the body is shorter or
+    longer than its Content-Length, so a truncated transfer is retried instead of kept.
+    """
+    received = 0
+    for chunk in iter_body(response, chunk_size):
+        if digest is not None:
+            digest.update(chunk)
+        file_obj.write(chunk)
+        received += len(chunk)
+    check_length(response, received)
+    return received
+
+def check_length(response, received):
+    """Raises ConnectionError if `received` does not match the response's Content-Length."""
+    expected = expected_length(response)
+    if expected is not None and received != expected:
+        raise requests.exceptions.ConnectionError(
+            f"Incomplete body for {response.url}: received {received} of {expected} bytes"
+        )
@@ -0,0 +1,191 @@
+"""
+👷 Queue workers: processes (on one or more hosts) that claim and download chapters from the job queue
+"""
+
+import multiprocessing
+import os
+import re
+import socket
+import threading
+import time
+
+from scraper.chapters import classify_chapter
+from scraper.details import get_manga_details
+from scraper.job_queue import CHAPTER_FINISHED, JobQueue
+from scraper.library import LibraryIndex
+from scraper.pipeline import DownloadPipeline
+from scraper.retry import start_retry_budget
+from scraper.scheduler import configure_scheduler
+from scraper.selection import ChapterIndex
+from utils import config
+from utils.conversion import ConversionStage
+from utils.logger import flush_logs, log_error, log_info, log_success
+from utils.metrics import start_metrics, write_run_report
+from utils.transcoder import transcode_summary, transcoding_enabled
+
+def expand_job(job_queue, job):
+    """
+    Fetches a job's series page, selects its chapters and stores them in the queue. Returns
+    (manga title, chapters of the series), or None after marking the job failed (or done,
+    when its selection matches no chapters).
+    """
+    manga_details = get_manga_details(job["url"])
+    if not manga_details:
+        job_queue.finish_job(job["id"], error="could not retrieve or parse manga details")
+        log_error(f"Could not retrieve or parse manga details: {job['url']}")
+        return None
+
+    manga_title = manga_details["title"]
+    try:
+        selected = ChapterIndex(manga_details["chapters"]).select(job["selection"])
+    except ValueError as e:
+        job_queue.finish_job(job["id"], error=str(e))
+        log_error(f"{manga_title}: {e}")
+        return None
+
+    job_queue.start_job(job["id"], manga_title, selected)
+    if not job_queue.chapter_urls(job["id"]):
+        # Nothing for workers to claim, so finish the job here rather than leave it running
+        status = job_queue.finish_job(job["id"])
+        log_info(f"{manga_title}: no chapters match '{job['selection']}', job {status}")
+        return None
+    return manga_title, manga_details["chapters"]
+
+def record_in_library(job_queue, series_url, title, chapters):
+    """
+    Adds finished chapters to the library index, as `scrape` and `batch` do. Every worker
+    rewrites the same library.json, so the load and save run under the queue's write lock.
+    """
+    with job_queue.exclusive():
+        library = LibraryIndex()
+        library.record_chapters(series_url, title, chapters)
+        library.save()
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class ChapterWorker:
+    """
+    Claims chapters from the queue a few at a time (all of one series), downloads them with
+    the threaded pipeline into the usual DOWNLOAD_DIR layout and records each outcome. A
+    heartbeat thread renews the worker's leases every third of WORKER_LEASE_SECONDS.
+    """
+
+    def __init__(self, job_queue, worker_id=None):
+        self.job_queue = job_queue
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = config.WORKER_LEASE_SECONDS
+        self.max_attempts = config.WORKER_MAX_ATTEMPTS
+        self.stopped = threading.Event()
+        self.converter = None
+        self.chapters_done = 0
+
+    def _heartbeat(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            try:
+                self.job_queue.heartbeat(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                log_error(f"{self.worker_id}: Heartbeat failed: {e}")
+
+    def _download(self, job, rows):
+        manga_title = job["title"]
+        create_pdf = bool(job["create_pdf"])
+        if (create_pdf or transcoding_enabled()) and self.converter is None:
+            self.converter = ConversionStage()
+        chapters = [classify_chapter(row["title"], row["url"], row["position"]) for row in rows]
+        log_info(f"{self.worker_id}: {manga_title}: claimed {len(chapters)} chapters")
+
+        def chapter_done(chapter, status):
+            self.job_queue.chapter_finished(job["id"], chapter.url, status)
+            if status in CHAPTER_FINISHED:
+                record_in_library(self.job_queue, job["url"], manga_title, [chapter])
+            self.chapters_done += 1
+
+        pipeline = DownloadPipeline(manga_title, create_pdf, bool(job["delete_images"]),
+                                    self.converter, job["output_format"],
+                                    on_chapter_done=chapter_done)
+        pipeline.run(chapters)
+
+        status = self.job_queue.settle_job(job["id"], self.max_attempts)
+        if status:
+            (log_success if status == "done" else log_error)(f"{self.worker_id}: {manga_title}: job {status}")
+
+    def run(self):
+        """Works until no job is queued and no other worker holds a live lease."""
+        heartbeat = threading.Thread(target=self._heartbeat, name="worker-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while True:
+                job = self.job_queue.claim_job(self.worker_id, self.lease_seconds)
+                if job is not None:
+                    expand_job(self.job_queue, job)
+                    continue
+
+                job, rows = self.job_queue.claim_chapters(self.worker_id, config.WORKER_CHAPTERS_PER_CLAIM,
+                                                          self.lease_seconds, self.max_attempts)
+                if job is not None:
+                    self._download(job, rows)
+                    continue
+
+                # Other workers may still die and leave their chapters behind
+                if not self.job_queue.has_active_work():
+                    break
+                time.sleep(config.WORKER_POLL_INTERVAL)
+        finally:
+            self.stopped.set()
+            self.job_queue.release(self.worker_id)
+            if self.converter:
+                self.converter.close()
+        return self.chapters_done
+
+def _report_path(worker_id):
+    """Each worker writes its own run report, next to METRICS_REPORT_PATH if one is set."""
+    suffix = re.sub(r"[^\w.-]", "_", worker_id)
+    if config.METRICS_REPORT_PATH:
+        root, ext = os.path.splitext(config.METRICS_REPORT_PATH)
+        return f"{root}-{suffix}{ext or '.json'}"
+    return os.path.join(config.METRICS_REPORT_DIR, time.strftime(f"run-%Y%m%d-%H%M%S-{suffix}.json"))
+
+def run_worker(queue_path=None, settings=None, max_requests=None):
+    """
+    Entry point of one worker process. `settings` are utils.config overrides from the command
+    line, applied again here because spawned processes start from a fresh config.
+    """
+    for name, value in (settings or {}).items():
+        setattr(config, name, value)
+    configure_scheduler(max_requests)
+    retry_budget = start_retry_budget()
+    start_metrics()
+
+    worker = ChapterWorker(JobQueue(queue_path))
+    try:
+        chapters_done = worker.run()
+        log_info(f"{worker.worker_id}: {chapters_done} chapters processed. {retry_budget.summary()}")
+        if transcoding_enabled():
+            log_info(f"{worker.worker_id}: {transcode_summary()}")
+        log_info(f"{worker.worker_id}: Run report written to {write_run_report(_report_path(worker.worker_id))}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Worker processes exit without running atexit hooks, so drain this process's log queue first
+        flush_logs()
+
+def run_workers(processes, queue_path=None, settings=None, max_requests=None):
+    """Runs `processes` workers on this host and waits for all of them."""
+    if processes <= 1:
+        run_worker(queue_path, settings, max_requests)
+        return
+
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(queue_path, settings, max_requests), name=f"worker-{i}")
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Workers get the same Ctrl+C and release their leases before exiting
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,70 @@
+"""
+Writes CBZ archives in page order while pages arrive out of order from many threads.
+"""
+
+import os
+import threading
+import zipfile
+
+class OrderedCbzWriter:
+    """
+    Stored (uncompressed) ZIP archive whose entries are written strictly in page order.
+
+    The worker holding the next page streams straight into its ZIP entry; workers that
+    are ahead of it keep their bytes in memory and hand them over with `deliver`, and
+    they are flushed as soon as every earlier page has been written or skipped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.part_path = path + ".part"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.zip = zipfile.ZipFile(self.part_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+        self.lock = threading.Lock()
+        self.next_index = 1
+        self.writing = False
+        self.pending = {}
+        self.written = 0
+
+    def begin(self, index, name):
+        """Opens the entry for page `index` if it is the next page and nobody is writing, else returns None."""
+        with self.lock:
+            if self.writing or index != self.next_index:
+                return None
+            self.writing = True
+        return self.zip.open(zipfile.ZipInfo(name), "w", force_zip64=True)
+
+    def end(self, entry):
+        """Closes an entry opened with `begin` and flushes any pages waiting behind it."""
+        entry.close()
+        with self.lock:
+            self.written += 1
+            self.next_index += 1
+            self._flush_pending()
+            self.writing = False
+
+    def deliver(self, index, name, data):
+        """Hands over a fully buffered page, or skips the page when `name` is None."""
+        with self.lock:
+            self.pending[index] = (name, data)
+            if not self.writing:
+                self.writing = True
+                self._flush_pending()
+                self.writing = False
+
+    def _flush_pending(self):
+        # Called with the lock held
+        while self.next_index in self.pending:
+            name, data = self.pending.pop(self.next_index)
+            if name is not None:
+                self.zip.writestr(zipfile.ZipInfo(name), data, compress_type=zipfile.ZIP_STORED)
+                self.written += 1
+            self.next_index += 1
+
+    def close(self, keep=True):
+        """Closes the archive and moves it into place, or discards it when `keep` is False."""
+        self.zip.close()
+        if keep:
+            os.replace(self.part_path, self.path)
+        else:
+            os.remove(self.part_path)
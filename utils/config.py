@@ -5,12 +5,61 @@
 # Scraper Settings
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36"
 REQUEST_TIMEOUT = 10  # seconds
-RETRY_COUNT = 3
-RETRY_DELAY = 2  # seconds
+RETRY_COUNT = 3  # retries per request
+RETRY_DELAY = 2  # seconds, base of the exponential backoff
+RETRY_MAX_DELAY = 30  # seconds, cap on a single backoff (including Retry-After)
+RETRY_BUDGET = 200  # total retries allowed per scrape run
+
+# Logging Settings
+LOG_MODE = "rich"  # "rich", "quiet" (errors only) or "json" (one JSON object per line)
+LOG_LEVEL = "info"  # "debug" also shows every downloaded image
+LOG_PROGRESS_INTERVAL = 1.0  # seconds between aggregated chapter progress lines
+LOG_BATCH_INTERVAL = 0.2  # seconds between batches delivered to the GUI
+
+HTML_PARSER = None  # BeautifulSoup backend: "lxml", "html.parser" or None to pick the fastest installed
+
+# HTTP Cache Settings
+HTTP_CACHE_ENABLED = True
+CACHE_DIR = ".cache/http"
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # least recently used entries are evicted past this size
+CACHE_TTL_SERIES = 10 * 60  # seconds, series and search pages
+CACHE_TTL_CHAPTER = 30 * 24 * 60 * 60  # seconds, chapter reader pages
+DETAILS_MEMO_TTL = 10 * 60  # seconds, parsed series pages kept in memory
 
 # Download Settings
 DOWNLOAD_DIR = "downloads"
 DOWNLOAD_THREADS = 10
+IMAGE_CHUNK_SIZE = 128 * 1024  # bytes read per call while streaming an image to disk
+SYNC_THREADS = 8  # series checked in parallel by `sync`
+BATCH_SERIES = 3  # series downloaded at once by `batch`
+JOB_QUEUE_PATH = None  # None keeps the `batch` queue in <DOWNLOAD_DIR>/jobs.sqlite3
+JOB_QUEUE_JOURNAL_MODE = "DELETE"  # SQLite journal of the queue; "WAL" is faster but only safe when every worker runs on one host
+WORKER_PROCESSES = 2  # worker processes started by `worker` on this host
+WORKER_CHAPTERS_PER_CLAIM = 4  # chapters of one series a worker leases at a time
+WORKER_LEASE_SECONDS = 120  # a worker that misses heartbeats this long loses its chapters to other workers
+WORKER_MAX_ATTEMPTS = 3  # tries per chapter before its job is left incomplete
+WORKER_POLL_INTERVAL = 5  # seconds an idle worker waits while other workers hold leases
+RESOLVER_THREADS = 3  # chapter pages fetched ahead of the image workers
+IMAGE_QUEUE_SIZE = 200  # image tasks buffered between the two stages
+DOWNLOAD_PRIORITY = "chapter"  # image order: "chapter", "round-robin" or "smallest"
+BLOB_STORE_ENABLED = False  # keep each distinct image once and hardlink it into chapter folders (--delete then keeps the stored copy)
+BLOB_STORE_DIR = None  # None stores blobs in <DOWNLOAD_DIR>/.blobs (must be on the same filesystem for hardlinks)
+CONVERSION_WORKERS = None  # PDF/CBZ conversion processes, None uses the CPU count
+TRANSCODE_FORMAT = None  # recompress downloaded pages to "webp", "avif" or "jxl"; None keeps the originals
+TRANSCODE_QUALITY = 80  # encoder quality (0-100)
+TRANSCODE_MIN_SAVING = 0.10  # keep the original unless the copy is at least this much smaller
+
+# Request Budget (shared by the chapter pool, the image pool and the async engine)
+MAX_IN_FLIGHT_REQUESTS = 16  # global cap on concurrent requests
+HTML_HOST_CONCURRENCY = 4  # toonily.com pages
+HTML_HOST_RATE = 4.0  # requests per second, 0 disables the limit
+IMAGE_HOST_CONCURRENCY = 12  # per image CDN host
+IMAGE_HOST_RATE = 25.0  # requests per second, 0 disables the limit
+
+# Run Metrics
+METRICS_REPORT_DIR = "reports"  # a JSON report per scrape/sync run is written here
+METRICS_REPORT_PATH = None  # fixed report path instead (set by --report)
+METRICS_EXPORT_INTERVAL = 15  # seconds between rewrites of the --metrics-file Prometheus file
 
 # Toonily Settings
 BASE_URL = "https://toonily.com"
@@ -0,0 +1,94 @@
+"""
+Runs chapter conversions (PDF, CBZ) as a separate pipeline stage in a process pool.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import config
+from utils.logger import log_info, log_error, render_logs_directly
+from utils.metrics import get_metrics, timed_call
+
+def _init_worker(settings):
+    """Runs in each conversion process, which is spawned and so starts from a fresh config."""
+    for name, value in settings.items():
+        setattr(config, name, value)
+    render_logs_directly()
+
+class ConversionStage:
+    """
+    Queue of conversion jobs backed by a ProcessPoolExecutor, so Pillow work runs on
+    all cores while the download threads keep the network busy.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or config.CONVERSION_WORKERS or os.cpu_count() or 1
+        # Spawned rather than forked: the pool starts while download and log threads may hold locks
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=({"LOG_MODE": config.LOG_MODE, "LOG_LEVEL": config.LOG_LEVEL},),
+        )
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.peak_depth = 0
+        self.started = time.monotonic()
+        self.busy_seconds = 0.0
+
+    def queue_depth(self):
+        """Jobs submitted but not finished yet (queued or running)."""
+        with self.lock:
+            return self.submitted - self.completed - self.failed
+
+    def submit(self, fn, *args, label=None):
+        """Queues `fn(*args)` for a worker process and returns its future, which resolves to `(result, seconds)`."""
+        submitted_at = time.monotonic()
+        # Timed inside the worker, so the metrics exclude the time spent queued
+        future = self.executor.submit(timed_call, fn, *args)
+        with self.lock:
+            self.submitted += 1
+            self.peak_depth = max(self.peak_depth, self.submitted - self.completed - self.failed)
+
+        def _done(done_future):
+            error = done_future.exception()
+            result = None
+            if error is None:
+                result, seconds = done_future.result()
+                get_metrics().observe(fn.__name__, seconds)
+            with self.lock:
+                self.busy_seconds += time.monotonic() - submitted_at
+                if result is not None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            if error is not None:
+                get_metrics().count(f"{fn.__name__}_failed")
+                log_error(f"Conversion failed for {label or args}: {error}")
+
+        future.add_done_callback(_done)
+        log_info(f"Queued conversion: {label or fn.__name__} (queue depth {self.queue_depth()})")
+        return future
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        with self.lock:
+            done = self.completed + self.failed
+            return (
+                f"Conversions: {self.completed} done, {self.failed} failed on {self.max_workers} processes, "
+                f"peak queue depth {self.peak_depth}, {done / elapsed * 60:.1f} chapters/min"
+            )
+
+    def close(self, wait=True):
+        """Waits for queued conversions (by default) and shuts the pool down."""
+        self.executor.shutdown(wait=wait)
+        log_info(self.summary())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,10 +1,20 @@
 """
-📋 Custom logger (success, error, debug)
+📋 Custom logger (success, error, debug, progress), rendered by a single consumer thread
 """
 
+import atexit
+import json
 import logging
-from rich.logging import RichHandler
+import os
+import queue
+import sys
+import threading
+import time
+
 from rich.console import Console
+from rich.logging import RichHandler
+
+from utils import config
 
 # -----------------
 # LOGGER SETUP
@@ -20,18 +30,201 @@ logging.basicConfig(
 log = logging.getLogger("rich")
 console = Console()
 
+LEVELS = {"debug": 10, "info": 20, "success": 20, "progress": 20, "error": 40}
+STYLES = {"debug": "bold yellow", "info": "bold blue", "success": "bold green", "error": "bold red"}
+
+_STOP = object()
+
+class LogRecord:
+    __slots__ = ("level", "message", "created", "key", "done", "total")
+
+    def __init__(self, level, message, key=None, done=None, total=None):
+        self.level = level
+        self.message = message
+        self.created = time.time()
+        self.key = key
+        self.done = done
+        self.total = total
+
+    def as_dict(self):
+        record = {"ts": round(self.created, 3), "level": self.level, "message": self.message}
+        if self.key is not None:
+            record.update(key=self.key, done=self.done, total=self.total)
+        return record
+
+class LogConsumer:
+    """
+    Drains the log queue on one thread, so worker threads never wait on Rich's console
+    lock. Progress records are coalesced per key and written at most every
+    LOG_PROGRESS_INTERVAL seconds (and once when they reach their total); sinks get the
+    plain-text lines in batches every LOG_BATCH_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.queue = queue.SimpleQueue()
+        self.sinks = []
+        self.sinks_lock = threading.Lock()
+        self.progress = {}
+        self.batch = []
+        self.last_progress_flush = 0.0
+        self.last_batch_flush = 0.0
+        self.thread = threading.Thread(target=self._run, name="log-consumer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=min(config.LOG_PROGRESS_INTERVAL, config.LOG_BATCH_INTERVAL))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP or isinstance(item, threading.Event):
+                self._flush_progress()
+                self._flush_batch()
+                if item is _STOP:
+                    return
+                item.set()
+                continue
+
+            if item is not None:
+                if item.level == "progress":
+                    self.progress[item.key] = item
+                    if item.done >= item.total:
+                        self._emit(self.progress.pop(item.key))
+                else:
+                    self._emit(item)
+
+            now = time.monotonic()
+            if now - self.last_progress_flush >= config.LOG_PROGRESS_INTERVAL:
+                self._flush_progress()
+            if now - self.last_batch_flush >= config.LOG_BATCH_INTERVAL:
+                self._flush_batch()
+
+    def _flush_progress(self):
+        self.last_progress_flush = time.monotonic()
+        progress, self.progress = self.progress, {}
+        for record in progress.values():
+            self._emit(record)
+
+    def _flush_batch(self):
+        self.last_batch_flush = time.monotonic()
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        with self.sinks_lock:
+            sinks = list(self.sinks)
+        for sink in sinks:
+            try:
+                sink(batch)
+            except Exception:
+                pass
+
+    def _emit(self, record):
+        _render(record)
+        with self.sinks_lock:
+            if self.sinks:
+                self.batch.append(format_plain(record))
+
+def format_plain(record):
+    if record.level == "progress":
+        return f"{record.key}: {record.done}/{record.total} {record.message}"
+    return f"{record.level.upper()}: {record.message}"
+
+def _render(record):
+    """Writes one record to the terminal in the configured LOG_MODE."""
+    mode = config.LOG_MODE
+    if mode == "json":
+        sys.stdout.write(json.dumps(record.as_dict()) + "\n")
+        sys.stdout.flush()
+    elif mode == "quiet":
+        if record.level == "error":
+            console.print(f"[{STYLES['error']}]ERROR:[/] {record.message}", highlight=False)
+    elif record.level == "progress":
+        console.print(f"[bold cyan]PROGRESS:[/] {format_plain(record)}", highlight=False)
+    else:
+        console.print(f"[{STYLES[record.level]}]{record.level.upper()}:[/] {record.message}")
+
+_consumer = None
+_consumer_lock = threading.Lock()
+_render_directly = False
+
+def _current_consumer():
+    """This process's consumer, or None; a forked process inherits its parent's but not the thread."""
+    consumer = _consumer
+    return consumer if consumer is not None and consumer.pid == os.getpid() else None
+
+def _get_consumer():
+    global _consumer
+    if _current_consumer() is None:
+        with _consumer_lock:
+            if _current_consumer() is None:
+                _consumer = LogConsumer()
+    return _consumer
+
+def render_logs_directly():
+    """
+    Process pool initializer for conversion workers: they log little and are stopped
+    without running atexit hooks, so they render their records directly.
+    """
+    global _render_directly
+    _render_directly = True
+
+def _submit(record):
+    if LEVELS[record.level] < LEVELS.get(config.LOG_LEVEL, LEVELS["info"]):
+        return
+    if _render_directly:
+        _render(record)
+        return
+    _get_consumer().queue.put(record)
+
+def flush_logs(timeout=5.0):
+    """Blocks until every record logged so far has been written (e.g. before prompting the user)."""
+    if _current_consumer() is None:
+        return
+    done = threading.Event()
+    _consumer.queue.put(done)
+    done.wait(timeout)
+
+def add_log_sink(callback):
+    """Registers `callback(lines)`, called from the consumer thread with batches of plain-text log lines."""
+    consumer = _get_consumer()
+    with consumer.sinks_lock:
+        consumer.sinks.append(callback)
+    return callback
+
+def remove_log_sink(callback):
+    """Flushes pending lines to `callback` and unregisters it."""
+    flush_logs()
+    consumer = _get_consumer()
+    with consumer.sinks_lock:
+        if callback in consumer.sinks:
+            consumer.sinks.remove(callback)
+
+def _shutdown():
+    consumer = _current_consumer()
+    if consumer is not None:
+        consumer.queue.put(_STOP)
+        consumer.thread.join(5.0)
+
+atexit.register(_shutdown)
+
 # -----------------
 # CUSTOM LOG FUNCTIONS
 # -----------------
 
 def log_success(message):
-    console.print(f"[bold green]SUCCESS:[/] {message}")
+    _submit(LogRecord("success", message))
 
 def log_error(message):
-    console.print(f"[bold red]ERROR:[/] {message}")
+    _submit(LogRecord("error", message))
 
 def log_debug(message):
-    console.print(f"[bold yellow]DEBUG:[/] {message}")
+    _submit(LogRecord("debug", message))
 
 def log_info(message):
-    console.print(f"[bold blue]INFO:[/] {message}")
+    _submit(LogRecord("info", message))
+
+def log_progress(key, done, total, unit="images"):
+    """Reports `done` of `total` for `key` (e.g. a chapter); only the latest value per interval is written."""
+    _submit(LogRecord("progress", unit, key=key, done=done, total=total))
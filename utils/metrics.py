@@ -0,0 +1,233 @@
+"""
+📈 Per-stage timings, byte counts and failure counts for a run (JSON report, Prometheus text)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from utils import config
+
+# Upper bounds in seconds, as in Prometheus' default latency histogram plus a slow tail
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are estimated as a bucket's upper bound."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 6),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+class RunMetrics:
+    """
+    Thread-safe metrics for one run: a latency histogram and byte count per stage
+    (fetch_html, parse_*, download_image, convert_to_pdf, ...), event counters
+    (retries, cache outcomes, failures) and per-chapter image outcomes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.started = time.monotonic()
+        self.stages = {}
+        self.bytes = {}
+        self.counters = {}
+        self.chapters = {}
+
+    def observe(self, stage, seconds, nbytes=0):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+            if nbytes:
+                self.bytes[stage] = self.bytes.get(stage, 0) + nbytes
+
+    def add_bytes(self, stage, nbytes):
+        with self.lock:
+            self.bytes[stage] = self.bytes.get(stage, 0) + nbytes
+
+    def count(self, event, amount=1):
+        with self.lock:
+            self.counters[event] = self.counters.get(event, 0) + amount
+
+    def record_image(self, chapter, ok):
+        """Counts one finished image of `chapter`, successful or not."""
+        with self.lock:
+            entry = self.chapters.setdefault(chapter, {"images": 0, "failed": 0})
+            entry["images" if ok else "failed"] += 1
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the block as one observation of `stage` (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def report(self):
+        """The run as a JSON-serialisable dict."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        with self.lock:
+            total_bytes = sum(self.bytes.values())
+            return {
+                "started_at": round(self.started_at, 3),
+                "duration_seconds": round(elapsed, 3),
+                "bytes_total": total_bytes,
+                "throughput_mib_per_second": round(total_bytes / 1024 / 1024 / elapsed, 3),
+                "stages": {stage: {**histogram.as_dict(), "bytes": self.bytes.get(stage, 0)}
+                           for stage, histogram in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "chapters": {title: dict(entry) for title, entry in self.chapters.items()},
+            }
+
+    def prometheus_text(self):
+        """The run in the Prometheus text exposition format (for node_exporter's textfile collector)."""
+        lines = [
+            "# HELP toonily_stage_seconds Latency of each pipeline stage.",
+            "# TYPE toonily_stage_seconds histogram",
+        ]
+        with self.lock:
+            for stage, histogram in sorted(self.stages.items()):
+                label = _label(stage)
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'toonily_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'toonily_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'toonily_stage_seconds_sum{{stage="{label}"}} {histogram.sum:.6f}')
+                lines.append(f'toonily_stage_seconds_count{{stage="{label}"}} {histogram.count}')
+
+            lines += ["# HELP toonily_stage_bytes_total Bytes transferred per stage.", "# TYPE toonily_stage_bytes_total counter"]
+            for stage, nbytes in sorted(self.bytes.items()):
+                lines.append(f'toonily_stage_bytes_total{{stage="{_label(stage)}"}} {nbytes}')
+
+            lines += ["# HELP toonily_events_total Retries, cache outcomes and failures.", "# TYPE toonily_events_total counter"]
+            for event, value in sorted(self.counters.items()):
+                lines.append(f'toonily_events_total{{event="{_label(event)}"}} {value}')
+
+            lines += ["# HELP toonily_chapter_images_total Finished images per chapter.", "# TYPE toonily_chapter_images_total counter"]
+            for title, entry in self.chapters.items():
+                lines.append(f'toonily_chapter_images_total{{chapter="{_label(title)}",outcome="ok"}} {entry["images"]}')
+                lines.append(f'toonily_chapter_images_total{{chapter="{_label(title)}",outcome="failed"}} {entry["failed"]}')
+
+        lines += ["# HELP toonily_run_duration_seconds Seconds since the run started.", "# TYPE toonily_run_duration_seconds gauge"]
+        lines.append(f"toonily_run_duration_seconds {time.monotonic() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path):
+        _write_atomic(path, json.dumps(self.report(), indent=2))
+
+    def write_prometheus(self, path):
+        _write_atomic(path, self.prometheus_text())
+
+class MetricsExporter:
+    """Rewrites a Prometheus text file with the current run's metrics every `interval` seconds."""
+
+    def __init__(self, path, interval=None):
+        self.path = path
+        self.interval = interval or config.METRICS_EXPORT_INTERVAL
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            get_metrics().write_prometheus(self.path)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops exporting and writes the final values."""
+        self.stopped.set()
+        self.thread.join()
+        get_metrics().write_prometheus(self.path)
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_run_report(path=None):
+    """Writes the current run's JSON report (to METRICS_REPORT_PATH, or a timestamped file) and returns its path."""
+    path = path or config.METRICS_REPORT_PATH or os.path.join(
+        config.METRICS_REPORT_DIR, time.strftime("run-%Y%m%d-%H%M%S.json"))
+    get_metrics().write_report(path)
+    return path
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def start_metrics():
+    """Starts fresh metrics for a new run and returns them."""
+    global _metrics
+    with _metrics_lock:
+        _metrics = RunMetrics()
+        return _metrics
+
+def get_metrics():
+    """Returns the metrics of the current run."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = RunMetrics()
+    return _metrics
+
+def timed(stage):
+    """Decorator recording every call of the function as one observation of `stage`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timed_call(fn, *args):
+    """Runs `fn(*args)` and returns `(result, seconds)`; used to time work done in worker processes."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
@@ -5,22 +5,40 @@ Handles the conversion of downloaded images to a PDF file.
 import os
 from PIL import Image
 from utils.logger import log_success, log_error
+from utils.pdf_writer import StreamingPdfWriter
 
-def convert_to_pdf(image_paths, pdf_path, delete_images=False):
+PASSTHROUGH_JPEG_MODES = ("L", "RGB", "CMYK")
+
+def add_page(pdf, image_path):
+    """
+    Adds one image to the PDF. JPEGs are embedded byte-for-byte without decoding;
+    other formats (PNG, WebP, GIF) are decoded and stored losslessly.
+    """
+    with Image.open(image_path) as image:
+        # Image.open only reads the header, so this check does not decode the JPEG
+        if image.format == "JPEG" and image.mode in PASSTHROUGH_JPEG_MODES:
+            with open(image_path, "rb") as f:
+                data = f.read()
+            pdf.add_jpeg(data, image.width, image.height, image.mode, inverted="adobe" in image.info)
+        else:
+            pdf.add_image(image)
+
+def convert_to_pdf(image_paths, pdf_path, delete_images=False, manifest_path=None):
     """
     Converts a list of images to a single PDF file without quality loss,
-    and optionally deletes the original images.
+    and optionally deletes the original images (and the chapter manifest at
+    `manifest_path`, so the emptied chapter folder can be removed too).
+    Pages are written one at a time, so memory use is bounded by the largest image
+    rather than the whole chapter.
     """
     try:
-        images = [Image.open(p).convert("RGB") for p in image_paths]
-        if images:
-            images[0].save(
-                pdf_path,
-                save_all=True,
-                append_images=images[1:],
-                resolution=100.0,
-                quality=100,
-            )
+        if image_paths:
+            part_path = pdf_path + ".part"
+            with open(part_path, "wb") as f:
+                with StreamingPdfWriter(f, resolution=100.0) as pdf:
+                    for image_path in image_paths:
+                        add_page(pdf, image_path)
+            os.replace(part_path, pdf_path)
             log_success(f"Successfully created PDF: {pdf_path}")
 
             if delete_images:
@@ -29,6 +47,8 @@ def convert_to_pdf(image_paths, pdf_path, delete_images=False):
                         os.remove(image_path)
                     except Exception as e:
                         log_error(f"Failed to delete image {image_path}: {e}")
+                if manifest_path and os.path.exists(manifest_path):
+                    os.remove(manifest_path)
                 # Attempt to remove the chapter folder if it's empty
                 folder_path = os.path.dirname(image_paths[0])
                 if not os.listdir(folder_path):
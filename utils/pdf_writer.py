@@ -0,0 +1,103 @@
+"""
+Minimal incremental PDF writer that emits one page at a time.
+"""
+
+import zlib
+
+class StreamingPdfWriter:
+    """
+    Writes a PDF page by page, so only the image currently being added is held in memory.
+    Each page is a single image scaled to the page, like Pillow's PDF plugin produces.
+    JPEG files can be embedded directly, everything else is stored losslessly.
+    """
+
+    def __init__(self, file_obj, resolution=100.0):
+        self.file = file_obj
+        self.scale = 72.0 / resolution
+        self.offsets = {}
+        self.page_ids = []
+        # Object 1 is the catalog and object 2 the page tree; both are written on close
+        self.next_id = 3
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.file.write(data)
+
+    def _tell(self):
+        return self.file.tell()
+
+    def _reserve_id(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body):
+        self.offsets[obj_id] = self._tell()
+        self._write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _write_stream_object(self, obj_id, dictionary, data):
+        self.offsets[obj_id] = self._tell()
+        self._write(f"{obj_id} 0 obj\n<< {dictionary} /Length {len(data)} >>\nstream\n".encode())
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+
+    def add_image_stream(self, data, width, height, color_space="/DeviceRGB", filter_name="/DCTDecode", extra=""):
+        """Adds a page showing an already-encoded image stream."""
+        image_id = self._reserve_id()
+        content_id = self._reserve_id()
+        page_id = self._reserve_id()
+
+        image_dict = (
+            f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace {color_space} /BitsPerComponent 8 /Filter {filter_name}"
+        )
+        if extra:
+            image_dict += " " + extra
+        self._write_stream_object(image_id, image_dict, data)
+
+        page_width = width * self.scale
+        page_height = height * self.scale
+        content = f"q {page_width:.4f} 0 0 {page_height:.4f} 0 0 cm /Im0 Do Q".encode()
+        self._write_stream_object(content_id, "", content)
+
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width:.4f} {page_height:.4f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def add_jpeg(self, data, width, height, mode, inverted=False):
+        """Adds a page that embeds JPEG bytes as-is (DCTDecode), without decoding them."""
+        color_space = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}[mode]
+        # Adobe CMYK JPEGs store inverted values
+        extra = "/Decode [1 0 1 0 1 0 1 0]" if mode == "CMYK" and inverted else ""
+        self.add_image_stream(data, width, height, color_space, "/DCTDecode", extra)
+
+    def add_image(self, image):
+        """Adds a Pillow image as a losslessly compressed (FlateDecode) page."""
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        color_space = "/DeviceGray" if image.mode == "L" else "/DeviceRGB"
+        compressor = zlib.compressobj(6)
+        data = compressor.compress(image.tobytes()) + compressor.flush()
+        self.add_image_stream(data, image.width, image.height, color_space, "/FlateDecode")
+
+    def close(self):
+        """Writes the page tree, catalog, cross-reference table and trailer."""
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self._tell()
+        self._write(f"xref\n0 {self.next_id}\n".encode())
+        self._write(b"0000000000 65535 f \n")
+        for obj_id in range(1, self.next_id):
+            self._write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode())
+        self._write(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
@@ -0,0 +1,154 @@
+"""
+Recompresses downloaded pages to WebP, AVIF or JPEG XL to save storage.
+"""
+
+import hashlib
+import io
+import os
+import time
+from importlib import import_module
+
+from PIL import Image
+
+from utils import config
+from utils.logger import log_error
+from utils.metrics import get_metrics
+
+# Pillow format name, file extension, and the plugin package that adds the format to older Pillow builds
+TRANSCODE_FORMATS = {
+    "webp": ("WEBP", ".webp", None),
+    "avif": ("AVIF", ".avif", "pillow_avif"),
+    "jxl": ("JXL", ".jxl", "pillow_jxl"),
+}
+
+def _load_format(fmt):
+    """True if Pillow can write `fmt`, importing its plugin package when needed."""
+    pil_format, _, plugin = TRANSCODE_FORMATS[fmt]
+    Image.init()
+    if pil_format not in Image.SAVE and plugin:
+        try:
+            import_module(plugin)
+        except ImportError:
+            return False
+    return pil_format in Image.SAVE
+
+def check_transcode_format(fmt):
+    """Returns an error message if `fmt` cannot be written here, else None."""
+    if fmt not in TRANSCODE_FORMATS:
+        return f"Unknown transcode format: {fmt}. Use one of: {', '.join(TRANSCODE_FORMATS)}."
+    if not _load_format(fmt):
+        plugin = TRANSCODE_FORMATS[fmt][2]
+        return f"This Pillow build cannot write {fmt}" + (f"; install the {plugin.replace('_', '-')}-plugin package." if plugin else ".")
+    return None
+
+def transcoding_enabled():
+    return bool(config.TRANSCODE_FORMAT)
+
+def transcode_image(image_path, fmt, quality, min_saving):
+    """
+    Writes a `fmt` copy of one page next to it, under the same page number. Returns
+    (original path, new path, original size, new size, sha256), or None when the page is kept:
+    already in `fmt`, animated, or the copy would save less than `min_saving` of its size.
+    """
+    pil_format, ext, _ = TRANSCODE_FORMATS[fmt]
+    root, src_ext = os.path.splitext(image_path)
+    if src_ext.lower() == ext:
+        return None
+
+    size = os.path.getsize(image_path)
+    with Image.open(image_path) as image:
+        if getattr(image, "n_frames", 1) > 1:
+            return None
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            has_alpha = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, quality=quality)
+
+    data = buffer.getvalue()
+    if len(data) > size * (1 - min_saving):
+        return None
+
+    new_path = root + ext
+    part_path = new_path + ".part"
+    with open(part_path, "wb") as f:
+        f.write(data)
+    os.replace(part_path, new_path)
+    return image_path, new_path, size, len(data), hashlib.sha256(data).hexdigest()
+
+def transcode_images(image_paths, fmt, quality, min_saving):
+    """
+    Transcodes a chapter's pages (run in a worker process). Originals are left in place for
+    apply_transcoded, so a crash never leaves a manifest pointing at a missing file.
+    """
+    _load_format(fmt)
+    cpu_start = time.process_time()
+    transcoded, kept, errors = [], 0, []
+    for image_path in image_paths:
+        try:
+            result = transcode_image(image_path, fmt, quality, min_saving)
+        except Exception as e:
+            # e.g. strips taller than WebP's 16383 px limit
+            errors.append((image_path, str(e)))
+            continue
+        if result:
+            transcoded.append(result)
+        elif not image_path.lower().endswith(TRANSCODE_FORMATS[fmt][1]):
+            kept += 1
+    return {"transcoded": transcoded, "kept": kept, "errors": errors, "cpu_seconds": time.process_time() - cpu_start}
+
+def apply_transcoded(manifest, outcome):
+    """Points the chapter manifest at the new pages, then deletes the originals."""
+    replacements = {
+        os.path.basename(src): (os.path.basename(dst), new_size, sha256)
+        for src, dst, _, new_size, sha256 in outcome["transcoded"]
+    }
+    if manifest is not None and replacements:
+        manifest.replace_files(replacements)
+
+    saved = 0
+    for src, _, size, new_size, _ in outcome["transcoded"]:
+        try:
+            # An original hardlinked elsewhere (e.g. into the image store) frees nothing when removed
+            freed = size if os.stat(src).st_nlink == 1 else 0
+            os.remove(src)
+            saved += freed - new_size
+        except OSError as e:
+            log_error(f"Failed to remove transcoded original {src}: {e}")
+    for image_path, error in outcome["errors"]:
+        log_error(f"Failed to transcode {image_path}: {error}")
+
+    metrics = get_metrics()
+    metrics.count("transcode_images", len(outcome["transcoded"]))
+    metrics.count("transcode_kept", outcome["kept"])
+    metrics.count("transcode_failed", len(outcome["errors"]))
+    metrics.count("transcode_bytes_in", sum(result[2] for result in outcome["transcoded"]))
+    metrics.count("transcode_bytes_saved", saved)
+    metrics.count("transcode_cpu_seconds", outcome["cpu_seconds"])
+
+def transcode_chapter(label, manifest, image_paths, converter=None):
+    """Recompresses a chapter's pages to TRANSCODE_FORMAT, in the conversion process pool when one is given."""
+    args = (sorted(image_paths), config.TRANSCODE_FORMAT, config.TRANSCODE_QUALITY, config.TRANSCODE_MIN_SAVING)
+    if converter is None:
+        with get_metrics().timer("transcode_images"):
+            apply_transcoded(manifest, transcode_images(*args))
+        return
+
+    def _apply(future):
+        if future.exception() is None:
+            outcome, _ = future.result()
+            apply_transcoded(manifest, outcome)
+
+    converter.submit(transcode_images, *args, label=f"{label} ({config.TRANSCODE_FORMAT})").add_done_callback(_apply)
+
+def transcode_summary():
+    counters = get_metrics().report()["counters"]
+    bytes_in = counters.get("transcode_bytes_in", 0)
+    saved = counters.get("transcode_bytes_saved", 0)
+    share = f" ({saved / bytes_in:.0%} of their size)" if bytes_in else ""
+    return (
+        f"Transcoding ({config.TRANSCODE_FORMAT}, quality {config.TRANSCODE_QUALITY}): "
+        f"{counters.get('transcode_images', 0)} pages recompressed, {counters.get('transcode_kept', 0)} kept, "
+        f"{counters.get('transcode_failed', 0)} failed, {saved / 1024 / 1024:.1f} MiB saved{share}, "
+        f"{counters.get('transcode_cpu_seconds', 0):.1f} CPU-seconds"
+    )